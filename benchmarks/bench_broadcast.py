@@ -0,0 +1,92 @@
+# Stdlib
+from argparse import ArgumentParser
+import logging
+import os
+import sys
+from time import perf_counter
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # ServerCore reads server.properties from the working directory
+
+# External Libraries
+from anyio import run  # noqa: E402
+
+# MCServer
+from mcserver.classes.client_connection import ClientConnection  # noqa: E402
+from mcserver.objects.broadcaster import Broadcaster  # noqa: E402
+from mcserver.utils.cryptography import make_shared_secret  # noqa: E402
+
+logging.getLogger("MC-Server").setLevel(logging.CRITICAL)
+
+MESSAGE = {"translate": "chat.type.text", "with": ["Notch", "Hello everyone, the server restarts in 5 minutes!"]}
+
+
+class NullStream:
+    _socket = SimpleNamespace(getsockname=lambda: ("127.0.0.1", 25565))
+    server_hostname = "localhost"
+
+
+def make_connection(protocol: int, threshold: int) -> ClientConnection:
+    conn = ClientConnection(NullStream())
+    conn.packet_decoder.protocol = protocol
+    conn.packet_decoder.status = 3
+    conn.compression_threshold = threshold
+    conn.cipher.enable(make_shared_secret())
+    return conn
+
+
+def flush(connections):
+    # What each write_loop does with the queued frames
+    for conn in connections:
+        conn.cipher.encrypt_into(b"".join(conn.write_queue.pending))
+
+
+def reset(connections):
+    # Nothing writes the queues out, empty them so backpressure never kicks in
+    for conn in connections:
+        conn.write_queue.pending.clear()
+        conn.write_queue.buffered = 0
+
+
+async def per_connection(connections, message):
+    for conn in connections:
+        await conn.send_packet("chat_message", message)
+
+
+async def broadcast(connections, message):
+    await Broadcaster.broadcast(connections, "chat_message", message)
+
+
+async def measure(send, connections, message, rounds: int) -> float:
+    total = 0.0
+    for _ in range(rounds):
+        reset(connections)
+        start = perf_counter()
+        await send(connections, message)
+        flush(connections)
+        total += perf_counter() - start
+    return total / rounds
+
+
+async def bench(args):
+    for count in (100, 1000, 5000):
+        # Mostly current clients with a few older ones, as on a real server
+        connections = [make_connection(340 if i % 10 else 47, args.threshold) for i in range(count)]
+        naive = await measure(per_connection, connections, MESSAGE, args.rounds)
+        shared = await measure(broadcast, connections, MESSAGE, args.rounds)
+        print(f"{count:>5} recipients: send_packet each {naive * 1000:8.2f}ms, "
+              f"broadcast {shared * 1000:8.2f}ms ({naive / shared:.1f}x)")
+
+
+def main():
+    parser = ArgumentParser(description="Sending one chat message to many players")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--threshold", type=int, default=64, help="Compression threshold, -1 disables it")
+    args = parser.parse_args()
+    run(bench, args, backend="curio")
+
+
+if __name__ == '__main__':
+    main()
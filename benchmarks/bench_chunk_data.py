@@ -0,0 +1,94 @@
+# Stdlib
+from argparse import ArgumentParser
+import logging
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # ServerCore reads server.properties from the working directory
+
+# External Libraries
+import numpy as np  # noqa: E402
+
+# MCServer
+from mcserver.game.chunk_section import ChunkSection  # noqa: E402
+from mcserver.utils.chunk_data import encode_column_1_7, encode_column_1_8, encode_column_1_9  # noqa: E402
+from mcserver.utils.misc import pack_varint  # noqa: E402
+
+logging.getLogger("MC-Server").setLevel(logging.CRITICAL)
+
+
+def make_section(rng: np.random.Generator, states: int) -> ChunkSection:
+    palette = rng.choice(1 << 13, states, replace=False).astype(np.uint32)
+    return ChunkSection(palette[rng.integers(0, states, 4096)],
+                        rng.integers(0, 16, 4096).astype(np.uint8),
+                        rng.integers(0, 16, 4096).astype(np.uint8))
+
+
+def loop_section(section: ChunkSection, protocol: int, sky_light: bool) -> bytes:
+    # Per-block reference: palette dict, bit packing into one big int, light one byte at a time
+    blocks = section.blocks.tolist()
+    palette = {}
+    for state in blocks:
+        palette.setdefault(state, len(palette))
+    bits = max(4, (len(palette) - 1).bit_length())
+    if bits > 8:
+        bits = 14 if protocol >= 393 else 13
+        indices = blocks
+        header = bytes((bits,)) + (b"" if protocol >= 393 else b"\x00")
+    else:
+        indices = [palette[state] for state in blocks]
+        header = bytes((bits,)) + pack_varint(len(palette)) + b"".join(pack_varint(state) for state in palette)
+
+    packed = 0
+    for i, index in enumerate(indices):
+        packed |= index << (i * bits)
+    longs = b"".join((packed >> (64 * i) & (1 << 64) - 1).to_bytes(8, "big") for i in range(64 * bits // 64))
+
+    def nibbles(values):
+        values = values.tolist()
+        return bytes(values[i] & 15 | values[i + 1] << 4 for i in range(0, 4096, 2))
+
+    out = header + pack_varint(64 * bits) + longs + nibbles(section.block_light)
+    if sky_light:
+        out += nibbles(section.sky_light)
+    return out
+
+
+def rate(func, seconds: float) -> float:
+    calls = 0
+    start = perf_counter()
+    while perf_counter() - start < seconds:
+        func()
+        calls += 1
+    return calls / (perf_counter() - start)
+
+
+def main():
+    parser = ArgumentParser(description="Chunk sections encoded per second, by protocol and palette size")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent on each measurement")
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    for states in (1, 16, 200, 1000):
+        # A full column, 16 sections
+        sections = [make_section(rng, states) for _ in range(16)]
+        for section in sections:
+            section.blocks &= (1 << 12) - 1
+        biomes = rng.integers(0, 40, 256)
+
+        results = [
+            ("1.7", 16 * rate(lambda: encode_column_1_7(sections, biomes, True, 6), args.seconds)),
+            ("1.8", 16 * rate(lambda: encode_column_1_8(sections, biomes, True), args.seconds)),
+            ("1.12", 16 * rate(lambda: encode_column_1_9(sections, 340, biomes, True), args.seconds)),
+            ("1.13", 16 * rate(lambda: encode_column_1_9(sections, 404, biomes, True), args.seconds)),
+        ]
+        loop = rate(lambda: loop_section(sections[0], 404, True), args.seconds)
+        print(f"{states:>4} states: " + ", ".join(f"{name} {value:8.0f}/s" for name, value in results) +
+              f" (1.13 per-block loop {loop:6.0f}/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# Stdlib
+from argparse import ArgumentParser
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# MCServer
+from mcserver.classes.frame_buffer import FrameBuffer  # noqa: E402
+from mcserver.utils.cryptography import Cipher, make_shared_secret  # noqa: E402
+
+
+def make_cipher() -> Cipher:
+    cipher = Cipher()
+    cipher.enable(make_shared_secret())
+    return cipher
+
+
+def outbound_copy(cipher: Cipher, packets):
+    # Before: every packet encrypted on its own when queued, then joined for the write
+    return b"".join([cipher.encrypt(packet) for packet in packets])
+
+
+def outbound_in_place(cipher: Cipher, packets):
+    # Now: packets joined when written, then encrypted once into the cipher's buffer
+    return cipher.encrypt_into(b"".join(packets))
+
+
+def inbound_copy(cipher: Cipher, buffer: FrameBuffer, chunk: bytes):
+    buffer.feed(cipher.decrypt(chunk))
+    buffer._start = buffer._end = 0
+
+
+def inbound_in_place(cipher: Cipher, buffer: FrameBuffer, chunk: bytes):
+    buffer.feed_decrypted(chunk, cipher)
+    buffer._start = buffer._end = 0
+
+
+def rate(func, args, size: int, seconds: float) -> float:
+    rounds = 0
+    start = perf_counter()
+    while perf_counter() - start < seconds:
+        for _ in range(100):
+            func(*args)
+        rounds += 100
+    return rounds * size / (perf_counter() - start) / (1 << 20)
+
+
+def main():
+    parser = ArgumentParser(description="AES/CFB8 throughput in MB/s, per-chunk copies vs update_into")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent on each measurement")
+    args = parser.parse_args()
+
+    for packet_size, batch in ((16, 32), (64, 32), (512, 8), (4096, 4)):
+        packets = [os.urandom(packet_size) for _ in range(batch)]
+        size = packet_size * batch
+        copy = rate(outbound_copy, (make_cipher(), packets), size, args.seconds)
+        in_place = rate(outbound_in_place, (make_cipher(), packets), size, args.seconds)
+        print(f"encrypt {batch:>2} x {packet_size:>4}B writes: {copy:8.1f} MB/s -> {in_place:8.1f} MB/s")
+
+    for chunk_size in (64, 1024, 16384):
+        chunk = os.urandom(chunk_size)
+        copy = rate(inbound_copy, (make_cipher(), FrameBuffer(), chunk), chunk_size, args.seconds)
+        in_place = rate(inbound_in_place, (make_cipher(), FrameBuffer(), chunk), chunk_size, args.seconds)
+        print(f"decrypt {chunk_size:>5}B reads:       {copy:8.1f} MB/s -> {in_place:8.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Stdlib
+from argparse import ArgumentParser
+import json
+import os
+import random
+import sys
+from time import process_time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# MCServer
+from mcserver.utils.compression import compress_packet  # noqa: E402
+from mcserver.utils.misc import pack_varint  # noqa: E402
+
+
+def make_traffic(rng: random.Random, seconds: int):
+    # Rough per-player mix: movement every tick, some chat, a chunk column now and then
+    packets = []
+    for _ in range(seconds):
+        for _ in range(20):
+            packets.append(pack_varint(0x26) + rng.getrandbits(8 * 24).to_bytes(24, "big"))
+        for _ in range(2):
+            chat = json.dumps({"text": f"<player{rng.randrange(100)}> " + "hello there " * rng.randrange(1, 8)})
+            packets.append(pack_varint(0x0F) + chat.encode())
+        if rng.random() < 0.5:
+            # Mostly stone with some ores and air, the way real terrain compresses
+            blocks = bytes(rng.choices((1, 0, 3, 14, 15, 16), (70, 20, 5, 2, 2, 1), k=4096 * 4))
+            packets.append(pack_varint(0x20) + blocks + bytes(4096))
+    return packets
+
+
+def main():
+    parser = ArgumentParser(description="Bandwidth and CPU cost of packet compression")
+    parser.add_argument("--seconds", type=int, default=60, help="Seconds of simulated player traffic")
+    parser.add_argument("--threshold", type=int, nargs="+", default=[-1, 64, 256, 1024, 8192])
+    parser.add_argument("--level", type=int, nargs="+", default=[1, 6, 9])
+    args = parser.parse_args()
+
+    packets = make_traffic(random.Random(1), args.seconds)
+    raw = sum(len(pack_varint(len(p))) + len(p) for p in packets)
+    print(f"{len(packets)} packets, {raw / 1024:.0f} KiB uncompressed")
+
+    for level in args.level:
+        for threshold in args.threshold:
+            start = process_time()
+            if threshold < 0:
+                sent = raw
+            else:
+                sent = sum(len(compress_packet(p, threshold, level)) for p in packets)
+            cpu = process_time() - start
+            print(f"level {level} threshold {threshold:>5}: {sent / 1024:>8.0f} KiB "
+                  f"({sent / raw:6.1%} of raw, {sent / args.seconds / 1024:6.1f} KiB/s per player), "
+                  f"{cpu * 1000:7.1f}ms CPU ({cpu / args.seconds * 100:.3f}% of a core per player)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+# Stdlib
+from argparse import ArgumentParser
+import logging
+import os
+import struct
+import sys
+from time import perf_counter
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # ServerCore reads server.properties from the working directory
+
+# External Libraries
+from anyio import run, create_event, create_task_group  # noqa: E402
+
+# MCServer
+from mcserver.classes.client_connection import ClientConnection  # noqa: E402
+from mcserver.objects.server_core import ServerCore  # noqa: E402
+from mcserver.utils.misc import pack_varint  # noqa: E402
+
+# Benchmarks
+from common import frame, percentile  # noqa: E402
+
+logging.getLogger("MC-Server").setLevel(logging.CRITICAL)
+
+
+def make_burst(count: int) -> bytes:
+    protocol = max(ServerCore.supported_protocols())
+    handshake = (pack_varint(0) + pack_varint(protocol) + pack_varint(9) + b"localhost" +
+                 struct.pack(">H", 25565) + pack_varint(1))
+    pings = b"".join(frame(pack_varint(1) + struct.pack(">q", i)) for i in range(count))
+    return frame(handshake) + pings
+
+
+class BurstStream:
+    # Stands in for a SocketStream: delivers one pipelined burst, records when each pong
+    # is written back, and reports EOF once every reply has been seen
+    def __init__(self, burst: bytes, replies: int):
+        self._socket = SimpleNamespace(getsockname=lambda: ("127.0.0.1", 25565))
+        self.server_hostname = "localhost"
+        self.burst = memoryview(burst)
+        self.replies = replies
+        self.sent = b""
+        self.times = []
+        self.values = []
+        self.done = create_event()
+        self.start = 0.0
+
+    async def receive_some(self, max_bytes: int) -> bytes:
+        if self.burst:
+            if not self.start:
+                self.start = perf_counter()
+            data = self.burst[:max_bytes].tobytes()
+            self.burst = self.burst[max_bytes:]
+            return data
+        await self.done.wait()
+        return b""
+
+    async def send_all(self, data: bytes):
+        now = perf_counter()
+        self.sent += data
+        # Pong frames are a fixed 10 bytes: length, packet id and a long
+        while len(self.sent) >= 10:
+            self.values.append(struct.unpack(">q", self.sent[2:10])[0])
+            self.sent = self.sent[10:]
+            self.times.append(now - self.start)
+        if len(self.times) >= self.replies:
+            await self.done.set()
+
+    async def close(self):
+        pass
+
+
+async def run_connections(connections: int, burst: bytes, replies: int):
+    streams = [BurstStream(burst, replies) for _ in range(connections)]
+    async with create_task_group() as tg:
+        for stream in streams:
+            await tg.spawn(ClientConnection(stream).serve)
+    return streams
+
+
+def main():
+    parser = ArgumentParser(description="Pipelined packet bursts through ClientConnection.serve_loop")
+    parser.add_argument("--packets", type=int, default=500)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 50])
+    parser.add_argument("--backend", default="curio")
+    args = parser.parse_args()
+
+    burst = make_burst(args.packets)
+    for connections in args.connections:
+        start = perf_counter()
+        streams = run(run_connections, connections, burst, args.packets, backend=args.backend)
+        elapsed = perf_counter() - start
+
+        latencies = [t * 1000 for stream in streams for t in stream.times]
+        total = len(latencies)
+        ordered = all(stream.values == sorted(stream.values) for stream in streams)
+        print(f"{connections:>4} conns x {args.packets} pings: {total / elapsed:>10,.0f} packets/s, "
+              f"p50 {percentile(latencies, 50):7.2f}ms, p99 {percentile(latencies, 99):7.2f}ms, "
+              f"max {max(latencies):7.2f}ms, in order: {ordered}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Stdlib
+from argparse import ArgumentParser
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# External Libraries
+import numpy as np  # noqa: E402
+
+# MCServer
+from mcserver.game.abc.entity_base import EntityBase  # noqa: E402
+from mcserver.objects.entity_store import EntityStore  # noqa: E402
+
+
+class ArrayEntity:
+    # The old layout: every entity owns its own small arrays
+    def __init__(self):
+        self.position = np.array([0.0, 0.0, 0.0])
+        self.velocity = np.array([0.1, 0.0, 0.1])
+
+
+def main():
+    parser = ArgumentParser(description="Moving every entity by its velocity, per object vs EntityStore")
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args()
+
+    for count in (100, 1000, 10000):
+        old = [ArrayEntity() for _ in range(count)]
+        start = perf_counter()
+        for _ in range(args.ticks):
+            for entity in old:
+                entity.position += entity.velocity
+        per_object = (perf_counter() - start) / args.ticks
+
+        new = [EntityBase() for _ in range(count)]
+        for entity in new:
+            entity.velocity = (0.1, 0.0, 0.1)
+        start = perf_counter()
+        for _ in range(args.ticks):
+            EntityStore.apply_velocity()
+        store = (perf_counter() - start) / args.ticks
+        for entity in new:
+            entity.remove()
+
+        print(f"{count:>6} entities: per object {per_object * 1000:8.3f}ms/tick, "
+              f"EntityStore {store * 1000:8.3f}ms/tick ({per_object / store:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# Stdlib
+from argparse import ArgumentParser
+import io
+import os
+import struct
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# MCServer
+from mcserver.classes.frame_buffer import FrameBuffer  # noqa: E402
+from mcserver.utils.misc import pack_varint, unpack_varint  # noqa: E402
+
+# Benchmarks
+from common import frame  # noqa: E402
+
+
+def make_stream(total: int, payload_size: int) -> bytes:
+    # Player position packets padded to `payload_size`, pipelined back to back
+    body = pack_varint(0x0D) + struct.pack(">dddb", 1.0, 64.0, 1.0, 1)
+    body += bytes(max(0, payload_size - len(body)))
+    packet = frame(body)
+    return packet * (total // len(packet) + 1)
+
+
+class FakeSocket:
+    # Hands out at most `burst` bytes per read, like a socket with pipelined data waiting
+    def __init__(self, stream: bytes, burst: int):
+        self.stream = memoryview(stream)
+        self.burst = burst
+        self.pos = 0
+
+    def receive_some(self, max_bytes: int) -> bytes:
+        size = min(max_bytes, self.burst)
+        data = self.stream[self.pos:self.pos + size].tobytes()
+        self.pos += size
+        return data
+
+
+def run_bytes(stream: bytes, burst: int) -> int:
+    # The previous serve_loop: fixed 1024 byte reads into a growing bytes object,
+    # re-wrapped in a BytesIO for every parse attempt
+    frames = 0
+    data = b""
+    sock = FakeSocket(stream, burst)
+    run_again = False
+    while True:
+        if not run_again:
+            line = sock.receive_some(1024)
+            if not line:
+                break
+            data += line
+
+        buffer = io.BytesIO(data)
+        length, pos = unpack_varint(data)
+        buffer.seek(pos)
+        if not pos or len(buffer.read()) < length:
+            run_again = False
+            continue
+        buffer.seek(pos + length)
+        data = buffer.read()
+        run_again = data != b""
+        frames += 1
+    return frames
+
+
+def run_frame_buffer(stream: bytes, burst: int) -> int:
+    frames = 0
+    buffer = FrameBuffer()
+    sock = FakeSocket(stream, burst)
+    while True:
+        line = sock.receive_some(buffer.receive_size)
+        if not line:
+            break
+        buffer.feed(line)
+        while buffer.next_frame() is not None:
+            frames += 1
+    return frames
+
+
+def main():
+    parser = ArgumentParser(description="Feed pipelined packets through the frame reader")
+    parser.add_argument("--megabytes", type=float, default=8)
+    parser.add_argument("--payload", type=int, nargs="+", default=[40, 4096, 262144])
+    parser.add_argument("--burst", type=int, default=65536,
+                        help="Maximum bytes a single read can return")
+    args = parser.parse_args()
+
+    for payload in args.payload:
+        stream = make_stream(int(args.megabytes * 1024 * 1024), payload)
+        print(f"{len(stream) / 1024 / 1024:.1f} MiB of {payload} byte payloads, {args.burst} byte bursts")
+
+        for name, func in (("bytes + BytesIO", run_bytes), ("FrameBuffer", run_frame_buffer)):
+            start = perf_counter()
+            frames = func(stream, args.burst)
+            elapsed = perf_counter() - start
+            print(f"{name:>16}: {frames} frames in {elapsed:.3f}s "
+                  f"({frames / elapsed:,.0f} frames/s, {len(stream) / elapsed / 1024 / 1024:.1f} MiB/s)")
+
+
+if __name__ == '__main__':
+    main()
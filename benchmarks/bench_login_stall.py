@@ -0,0 +1,87 @@
+# Stdlib
+from argparse import ArgumentParser
+import logging
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # ServerCore reads server.properties from the working directory
+
+# External Libraries
+from anyio import run, sleep, create_task_group, create_event  # noqa: E402
+
+# MCServer
+from mcserver.objects.crypto_pool import CryptoPool  # noqa: E402
+from mcserver.objects.server_core import ServerCore  # noqa: E402
+from mcserver.utils.cryptography import (  # noqa: E402
+    decrypt_secret, encrypt_secret, make_shared_secret, make_verify_token
+)
+
+logging.getLogger("MC-Server").setLevel(logging.CRITICAL)
+
+TICK = 0.001
+
+
+async def ticker(stop, lateness):
+    # Stands in for every other connection: how long past its deadline does it wake up?
+    while not stop.is_set():
+        start = perf_counter()
+        await sleep(TICK)
+        lateness.append(perf_counter() - start - TICK)
+
+
+async def login_inline(secret: bytes, verify: bytes):
+    return decrypt_secret(ServerCore.keypair, secret), decrypt_secret(ServerCore.keypair, verify)
+
+
+async def login_pool(secret: bytes, verify: bytes):
+    return await CryptoPool.decrypt_secrets(secret, verify)
+
+
+async def storm(login, logins):
+    # Start the pool's threads/processes before measuring
+    await login(*logins[0])
+
+    stop = create_event()
+    lateness = []
+    async with create_task_group() as outer:
+        await outer.spawn(ticker, stop, lateness)
+        await sleep(0.05)
+
+        start = perf_counter()
+        async with create_task_group() as tg:
+            for secret, verify in logins:
+                await tg.spawn(login, secret, verify)
+        elapsed = perf_counter() - start
+
+        await stop.set()
+    return elapsed, lateness
+
+
+def main():
+    parser = ArgumentParser(description="Event loop stall while a burst of logins is decrypted")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=ServerCore.crypto_workers)
+    args = parser.parse_args()
+
+    ServerCore.crypto_workers = args.workers
+    public_key = ServerCore.keypair.public_key()
+    logins = [(encrypt_secret(public_key, make_shared_secret()), encrypt_secret(public_key, make_verify_token()))
+              for _ in range(args.logins)]
+
+    for name, login, processes in (("inline", login_inline, False),
+                                   ("threads", login_pool, False),
+                                   ("processes", login_pool, True)):
+        ServerCore.crypto_processes = processes
+        CryptoPool.limiter = None
+        elapsed, lateness = run(storm, login, logins, backend="curio")
+        lateness = sorted(lateness)
+        print(f"{name:>10}: {args.logins} logins in {elapsed * 1000:7.1f}ms, loop stall "
+              f"p99 {lateness[int(len(lateness) * 0.99)] * 1000:6.2f}ms, max {lateness[-1] * 1000:6.2f}ms")
+    CryptoPool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
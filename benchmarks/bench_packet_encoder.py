@@ -0,0 +1,51 @@
+# Stdlib
+from argparse import ArgumentParser
+import logging
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # ServerCore reads server.properties from the working directory
+
+# MCServer
+from mcserver.classes.packet_encoder import PacketEncoder  # noqa: E402
+from mcserver.objects.server_core import ServerCore  # noqa: E402
+
+logging.getLogger("MC-Server").setLevel(logging.CRITICAL)
+
+STATUS = {
+    "description": {"text": "A Python Minecraft Server"},
+    "players": {"online": 12, "max": 20},
+    "version": {"name": "1.12.2", "protocol": 340},
+}
+
+PACKETS = (
+    ("pong", (1234567890,)),
+    ("status", (STATUS,)),
+    ("encryption_start", ("0123456789abcdef0123", b"\x01\x02\x03\x04")),
+)
+
+
+def main():
+    parser = ArgumentParser(description="Packets encoded per second by PacketEncoder")
+    parser.add_argument("--count", type=int, default=200000)
+    args = parser.parse_args()
+
+    protocol = max(ServerCore.supported_protocols())
+    encoder = PacketEncoder(protocol)
+    for name, packet_args in PACKETS:
+        for _ in range(1000):
+            encoder.encode(name, packet_args)
+
+        start = perf_counter()
+        for _ in range(args.count):
+            encoder.encode(name, packet_args)
+        elapsed = perf_counter() - start
+        print(f"{name:>16}: {args.count / elapsed:>12,.0f} packets/s "
+              f"({elapsed / args.count * 1e6:.2f}us per packet)")
+
+
+if __name__ == '__main__':
+    main()
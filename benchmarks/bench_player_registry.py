@@ -0,0 +1,63 @@
+# Stdlib
+from argparse import ArgumentParser
+import logging
+import os
+import sys
+from time import perf_counter
+from uuid import uuid4
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # ServerCore reads server.properties from the working directory
+
+# MCServer
+from mcserver.objects.player_registry import PlayerRegistry  # noqa: E402
+
+logging.getLogger("MC-Server").setLevel(logging.CRITICAL)
+
+
+class FakeConnection:
+    def __init__(self, number: int):
+        self.uuid = uuid4()
+        self.name = f"Player{number}"
+
+
+def fill(count: int):
+    PlayerRegistry.players.clear()
+    PlayerRegistry.players_by_name.clear()
+    PlayerRegistry.players_by_entity_id.clear()
+    for number in range(count):
+        PlayerRegistry.add_player(FakeConnection(number))
+
+
+def timed(func, keys, rounds: int) -> float:
+    start = perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            func(key)
+    return (perf_counter() - start) / (rounds * len(keys)) * 1e9
+
+
+def main():
+    parser = ArgumentParser(description="PlayerRegistry lookup cost by registry size")
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+
+    for count in (10, 100, 1000, 10000):
+        fill(count)
+        players = PlayerRegistry.all_players()
+        # Spread the lookups over the whole registry, a list scan would pay for the later ones
+        sample = [players[i * count // 100] for i in range(min(count, 100))]
+        rounds = max(1, args.lookups // len(sample))
+
+        uuids = [p.uuid for p in sample]
+        names = [p.name.upper() for p in sample]
+        entity_ids = [p.entity.id for p in sample]
+        print(f"{count:>6} players: "
+              f"uuid {timed(PlayerRegistry.get_player, uuids, rounds):6.0f}ns, "
+              f"name {timed(PlayerRegistry.get_player_by_name, names, rounds):6.0f}ns, "
+              f"entity id {timed(PlayerRegistry.get_player_by_entity_id, entity_ids, rounds):6.0f}ns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Stdlib
+from argparse import ArgumentParser
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# External Libraries
+import numpy as np  # noqa: E402
+
+# MCServer
+from mcserver.game.abc.entity_base import EntityBase  # noqa: E402
+from mcserver.objects.entity_store import EntityStore  # noqa: E402
+from mcserver.objects.spatial_index import SpatialIndex  # noqa: E402
+
+VIEW_DISTANCE = 10 * 16
+
+
+def main():
+    parser = ArgumentParser(description="View-distance queries and movement upkeep of the SpatialIndex")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--scan-queries", type=int, default=20, help="Queries answered by a full scan")
+    parser.add_argument("--world-size", type=float, default=4000, help="Side of the square entities spawn in")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    entities = []
+    for count in (1000, 5000, 20000):
+        while len(entities) < count:
+            entity = EntityBase()
+            entity.position = rng.uniform(-args.world_size / 2, args.world_size / 2, 3) * (1, 0, 1) + (0, 64, 0)
+            entity.velocity = rng.uniform(-0.5, 0.5, 3) * (1, 0, 1)
+            entities.append(entity)
+        centers = [entities[i].position.copy() for i in rng.integers(0, count, args.queries)]
+
+        # Every entity against the query, what a broadcast would do without the index
+        start = perf_counter()
+        for center in centers[:args.scan_queries]:
+            [e for e in entities if ((e.position - center) ** 2).sum() <= VIEW_DISTANCE ** 2]
+        scan = (perf_counter() - start) / args.scan_queries
+
+        start = perf_counter()
+        for center in centers:
+            found = SpatialIndex.query_radius(center, VIEW_DISTANCE)
+        indexed = (perf_counter() - start) / len(centers)
+
+        start = perf_counter()
+        for _ in range(20):
+            SpatialIndex.update_many(EntityStore.apply_velocity())
+        tick = (perf_counter() - start) / 20
+
+        print(f"{count:>6} entities: scan {scan * 1e3:8.3f}ms/query, index {indexed * 1e3:6.3f}ms/query "
+              f"(~{len(found)} found), move + reindex {tick * 1e3:6.3f}ms/tick")
+
+
+if __name__ == '__main__':
+    main()
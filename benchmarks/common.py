@@ -0,0 +1,17 @@
+# Helpers shared by the benchmark scripts, which put the repository root on sys.path before importing this.
+# Varints are read and written with mcserver.utils.misc, the same code the server uses.
+
+# MCServer
+from mcserver.utils.misc import pack_varint
+
+
+def frame(body: bytes) -> bytes:
+    # Uncompressed framing: the length, then the packet
+    return pack_varint(len(body)) + body
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
@@ -0,0 +1,347 @@
+# Stdlib
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import struct
+import subprocess
+import sys
+from threading import Thread
+from time import perf_counter, sleep as blocking_sleep
+from urllib.parse import parse_qs, urlparse
+from uuid import NAMESPACE_OID, uuid3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# External Libraries
+from anyio import run, sleep, connect_tcp, create_task_group, current_time, fail_after  # noqa: E402
+
+# MCServer
+from mcserver.classes.frame_buffer import FrameBuffer  # noqa: E402
+from mcserver.utils.compression import compress_packet, decompress_packet  # noqa: E402
+from mcserver.utils.cryptography import Cipher, encrypt_secret, import_public_key, make_shared_secret  # noqa: E402
+from mcserver.utils.misc import pack_varint, unpack_varint  # noqa: E402
+
+# Benchmarks
+from common import frame, percentile  # noqa: E402
+
+SERVER_SCRIPT = """
+import sys
+from mcserver.objects.server_core import ServerCore
+ServerCore.options["server-port"] = int(sys.argv[1])
+if sys.argv[2]:
+    ServerCore.session_server = sys.argv[2]
+ServerCore.workers = int(sys.argv[3])
+ServerCore.run()
+"""
+
+
+class StubSessionHandler(BaseHTTPRequestHandler):
+    # Accepts every hasJoined request, like the session server does for a legit client
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        username = parse_qs(urlparse(self.path).query)["username"][0]
+        body = json.dumps({
+            "id": uuid3(NAMESPACE_OID, username).hex,
+            "name": username,
+            "properties": []
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_session_server(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubSessionHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def read_rss(pid: int) -> int:
+    # Resident set size in KiB, 0 if the process is not visible
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class Stats:
+    def __init__(self):
+        self.connections = 0
+        self.packets = 0
+        self.errors = 0
+        self.latencies = []
+
+
+class Client:
+    def __init__(self, args, stats: Stats):
+        self.args = args
+        self.stats = stats
+        self.stream = None
+        self.buffer = FrameBuffer()
+        self.cipher = Cipher()
+        self.compression_threshold = -1
+
+    async def connect(self):
+        self.stream = await connect_tcp(self.args.host, self.args.port)
+
+    async def close(self):
+        await self.stream.close()
+
+    async def send(self, *payloads: bytes):
+        data = b""
+        for payload in payloads:
+            if self.compression_threshold >= 0:
+                data += compress_packet(payload, self.compression_threshold, 1)
+            else:
+                data += frame(payload)
+        await self.stream.send_all(self.cipher.encrypt(data))
+        self.stats.packets += len(payloads)
+
+    async def receive(self) -> memoryview:
+        while True:
+            packet = self.buffer.next_frame()
+            if packet is not None:
+                self.stats.packets += 1
+                if self.compression_threshold >= 0:
+                    packet = decompress_packet(packet, self.compression_threshold)
+                return packet
+
+            data = await self.stream.receive_some(self.buffer.receive_size)
+            if not data:
+                raise ConnectionError("Server closed the connection")
+            self.buffer.feed(self.cipher.decrypt(data))
+
+    def handshake(self, next_state: int) -> bytes:
+        host = self.args.host.encode()
+        return (pack_varint(0) + pack_varint(self.args.protocol) + pack_varint(len(host)) + host +
+                struct.pack(">H", self.args.port) + pack_varint(next_state))
+
+    async def status(self):
+        await self.send(self.handshake(1), pack_varint(0))
+        await self.receive()
+        await self.send(pack_varint(1) + struct.pack(">q", 0))
+        await self.receive()
+
+    async def login(self, username: str):
+        name = username.encode()
+        await self.send(self.handshake(2), pack_varint(0) + pack_varint(len(name)) + name)
+
+        packet = await self.receive()
+        pos = 1
+        values = []
+        for _ in range(3):
+            # Server id, public key, verify token
+            size, prefix = unpack_varint(packet, pos)
+            pos += prefix
+            values.append(packet[pos:pos + size].tobytes())
+            pos += size
+        public_key = import_public_key(values[1])
+        verify_token = values[2]
+
+        secret = make_shared_secret()
+        encrypted_secret = encrypt_secret(public_key, secret)
+        encrypted_token = encrypt_secret(public_key, verify_token)
+        await self.send(pack_varint(1) +
+                        pack_varint(len(encrypted_secret)) + encrypted_secret +
+                        pack_varint(len(encrypted_token)) + encrypted_token)
+        self.cipher.enable(secret)
+
+        while True:
+            packet = await self.receive()
+            if packet[0] == 0x03:
+                # Set Compression, everything after it uses the compressed framing
+                self.compression_threshold = unpack_varint(packet, 1)[0]
+            elif packet[0] == 0x02:
+                return
+            else:
+                raise ConnectionError(f"Unexpected login packet {packet[0]}")
+
+
+async def status_worker(args, stats: Stats, deadline: float):
+    while await current_time() < deadline:
+        start = perf_counter()
+        client = Client(args, stats)
+        try:
+            async with fail_after(args.timeout):
+                await client.connect()
+                await client.status()
+                await client.close()
+        except (OSError, ConnectionError, ValueError):
+            stats.errors += 1
+            continue
+        stats.latencies.append(perf_counter() - start)
+        stats.connections += 1
+
+
+async def login_worker(args, stats: Stats, deadline: float, worker: int):
+    attempt = 0
+    while await current_time() < deadline:
+        start = perf_counter()
+        client = Client(args, stats)
+        try:
+            async with fail_after(args.timeout):
+                await client.connect()
+                await client.login(f"load{worker}_{attempt}"[:16])
+                await client.close()
+        except (OSError, ConnectionError, ValueError):
+            stats.errors += 1
+            continue
+        finally:
+            attempt += 1
+        stats.latencies.append(perf_counter() - start)
+        stats.connections += 1
+
+
+async def play_worker(args, stats: Stats, deadline: float, worker: int):
+    client = Client(args, stats)
+    try:
+        async with fail_after(args.timeout):
+            await client.connect()
+            await client.login(f"play{worker}"[:16])
+    except (OSError, ConnectionError, ValueError):
+        stats.errors += 1
+        return
+    stats.connections += 1
+
+    # Player Position packets in bursts of one tick's worth
+    batch = max(1, args.rate // 20)
+    packet = pack_varint(0x0D) + struct.pack(">ddd?", 0.5, 64.0, 0.5, True)
+    try:
+        while await current_time() < deadline:
+            await client.send(*[packet] * batch)
+            await sleep(0.05)
+        await client.close()
+    except (OSError, ConnectionError):
+        stats.errors += 1
+
+
+async def probe_worker(args, stats: Stats, deadline: float):
+    # Status round trips next to the play load, to see how responsive the server stays
+    probe_stats = Stats()
+    while await current_time() < deadline:
+        start = perf_counter()
+        client = Client(args, probe_stats)
+        try:
+            async with fail_after(args.timeout):
+                await client.connect()
+                await client.status()
+                await client.close()
+        except (OSError, ConnectionError, ValueError):
+            stats.errors += 1
+        else:
+            stats.latencies.append(perf_counter() - start)
+        await sleep(0.1)
+
+
+async def run_load(args, stats: Stats, rss: list):
+    deadline = await current_time() + args.duration
+    async with create_task_group() as tg:
+        if args.server_pid:
+            await tg.spawn(sample_rss, args.server_pid, deadline, rss)
+        for worker in range(args.clients):
+            if args.scenario == "status":
+                await tg.spawn(status_worker, args, stats, deadline)
+            elif args.scenario == "login":
+                await tg.spawn(login_worker, args, stats, deadline, worker)
+            else:
+                await tg.spawn(play_worker, args, stats, deadline, worker)
+        if args.scenario == "play":
+            await tg.spawn(probe_worker, args, stats, deadline)
+
+
+async def sample_rss(pid: int, deadline: float, rss: list):
+    while await current_time() < deadline:
+        rss.append(read_rss(pid))
+        await sleep(0.5)
+
+
+def main():
+    parser = ArgumentParser(description="Synthetic load against a local MCServer, results as JSON")
+    parser.add_argument("scenario", choices=("status", "login", "play"))
+    parser.add_argument("--clients", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Seconds before a handshake counts as an error")
+    parser.add_argument("--rate", type=int, default=20, help="Play packets per second per client")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=25565)
+    parser.add_argument("--protocol", type=int, default=340)
+    parser.add_argument("--spawn-server", action="store_true",
+                        help="Start the server (and a stub session server) for this run")
+    parser.add_argument("--workers", type=int, default=1, help="ServerCore.workers for --spawn-server")
+    parser.add_argument("--server-pid", type=int, default=0, help="Server to sample RSS from")
+    parser.add_argument("--stub-port", type=int, default=0,
+                        help="Run a stub session server on this port (implied by --spawn-server)")
+    parser.add_argument("--output", help="File to write the JSON results to")
+    args = parser.parse_args()
+
+    server = None
+    session_server = ""
+    if args.spawn_server and not args.stub_port:
+        args.stub_port = 8085
+    if args.stub_port:
+        start_stub_session_server(args.stub_port)
+        session_server = f"http://127.0.0.1:{args.stub_port}"
+    if args.spawn_server:
+        command = [sys.executable, "-c", SERVER_SCRIPT, str(args.port), session_server, str(args.workers)]
+        server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        args.server_pid = server.pid
+        blocking_sleep(3)  # Key generation and startup
+
+    stats = Stats()
+    rss = []
+    rss_start = read_rss(args.server_pid) if args.server_pid else 0
+    start = perf_counter()
+    try:
+        run(run_load, args, stats, rss, backend="asyncio")
+    finally:
+        elapsed = perf_counter() - start
+        rss_end = read_rss(args.server_pid) if args.server_pid else 0
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies = [t * 1000 for t in stats.latencies]
+    results = {
+        "scenario": args.scenario,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "clients": args.clients,
+        "duration": round(elapsed, 3),
+        "connections": stats.connections,
+        "connections_per_sec": round(stats.connections / elapsed, 1),
+        "packets": stats.packets,
+        "packets_per_sec": round(stats.packets / elapsed, 1),
+        "errors": stats.errors,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies, default=0.0), 3),
+        },
+        "server_rss_kib": {
+            "start": rss_start,
+            "end": rss_end,
+            "peak": max(rss + [rss_start, rss_end]),
+        },
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from functools import lru_cache
+from math import atan2
+from typing import TYPE_CHECKING
+
+# External Libraries
+from anyio import sleep
+
+# MCServer
+from mcserver.objects.entity_store import EntityStore
+from mcserver.objects.server_core import ServerCore
+from mcserver.objects.terrain_pool import TerrainPool
+
+if TYPE_CHECKING:
+    from typing import List, Optional, Set, Tuple
+    from mcserver.classes.client_connection import ClientConnection
+
+    Chunk = Tuple[int, int]
+
+
+@lru_cache(maxsize=None)
+def spiral_rank(dx: int, dz: int) -> Tuple[int, int, float]:
+    # Ring around the center first, then distance, then angle, so chunks fill in as a spiral
+    return max(abs(dx), abs(dz)), dx * dx + dz * dz, atan2(dz, dx)
+
+
+def square_difference(center: Chunk, other: Chunk, radius: int) -> List[Chunk]:
+    # Chunks within `radius` of `center` but not of `other`, without walking the shared part
+    (cx, cz), (ox, oz) = center, other
+    chunks = []
+    for x in range(cx - radius, cx + radius + 1):
+        if abs(x - ox) > radius:
+            chunks += [(x, z) for z in range(cz - radius, cz + radius + 1)]
+            continue
+        chunks += [(x, z) for z in range(cz - radius, min(oz - radius, cz + radius + 1))]
+        chunks += [(x, z) for z in range(max(oz + radius + 1, cz - radius), cz + radius + 1)]
+    return chunks
+
+
+class ChunkStreamer:
+    # Sends the chunks around a player, closest first, a few per tick: at most
+    # ServerCore.chunk_bytes_per_tick, and only while the write queue is below chunk_queue_limit.
+    # When the player enters another chunk only the edge of the view square changes: chunks that
+    # left it are unloaded if sent or dropped from the queue if not, the new edge is queued.
+
+    def __init__(self, conn: ClientConnection):
+        self.conn = conn
+        self.radius = ServerCore.options["view-distance"]
+        self.dimension = 0
+        self.center: Optional[Chunk] = None
+        self.sent: Set[Chunk] = set()
+        self.queued: Set[Chunk] = set()
+        # `queued` closest last, so the next chunk to send is popped off the end
+        self.order: List[Chunk] = []
+
+    def rank(self, chunk: Chunk) -> Tuple[int, int, float]:
+        return spiral_rank(chunk[0] - self.center[0], chunk[1] - self.center[1])
+
+    def move(self, center: Chunk, dimension: int) -> List[Chunk]:
+        # Returns the sent chunks that have to be unloaded
+        if self.center is None or dimension != self.dimension:
+            # Joined or changed dimension, the client drops the old chunks itself
+            leaving = []
+            self.sent.clear()
+            self.queued.clear()
+            self.dimension = dimension
+            self.center = center
+            entering = [(x, z) for x in range(center[0] - self.radius, center[0] + self.radius + 1)
+                        for z in range(center[1] - self.radius, center[1] + self.radius + 1)]
+        else:
+            leaving = square_difference(self.center, center, self.radius)
+            entering = square_difference(center, self.center, self.radius)
+            self.center = center
+
+        unload = []
+        for chunk in leaving:
+            if chunk in self.sent:
+                self.sent.remove(chunk)
+                unload.append(chunk)
+            else:
+                self.queued.discard(chunk)
+        self.queued.update(chunk for chunk in entering if chunk not in self.sent)
+        self.order = sorted(self.queued, key=self.rank, reverse=True)
+        return unload
+
+    async def tick(self):
+        conn = self.conn
+        entity_id = conn.player.entity.id
+        center = tuple(EntityStore.chunks[entity_id].tolist())
+        dimension = int(EntityStore.dimensions[entity_id])
+        if center != self.center or dimension != self.dimension:
+            for x, z in self.move(center, dimension):
+                await conn.send_packet("unload_chunk", x, z)
+
+        # Generation runs ahead of sending by a few chunks, in the pool's own distance order
+        for x, z in self.order[-ServerCore.chunk_prefetch:]:
+            await TerrainPool.request(x, z, self.dimension)
+
+        budget = min(ServerCore.chunk_bytes_per_tick, ServerCore.chunk_queue_limit - conn.write_queue.buffered)
+        while self.order and budget > 0:
+            x, z = self.order[-1]
+            chunk = TerrainPool.get_cached(x, z, self.dimension)
+            if chunk is None:
+                # Still generating, closer chunks must not be overtaken
+                break
+            self.order.pop()
+            self.queued.remove((x, z))
+            self.sent.add((x, z))
+
+            budget -= await conn.send_packet("chunk_data", x, z, chunk.to_sections(conn.protocol_version),
+                                             chunk.biomes, self.dimension == 0)
+
+    async def run(self):
+        while not self.conn.write_queue.closed:
+            await self.tick()
+            await sleep(ServerCore.chunk_tick)
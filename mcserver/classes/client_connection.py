@@ -2,28 +2,36 @@
 from __future__ import annotations
 
 # Stdlib
+from collections import deque
+from time import perf_counter
 import traceback
-from traceback import format_exc
 from typing import TYPE_CHECKING, Any, Tuple
 from uuid import UUID
 
 # External Libraries
-from anyio import sleep, create_event, create_task_group
+from anyio import (sleep, fail_after, create_event, create_lock, create_task_group, create_capacity_limiter,
+                   open_cancel_scope)
 from anyio.exceptions import TLSRequired
 from quarry.data import packets
 
 # MCServer
+from mcserver.classes.frame_buffer import FrameBuffer
 from mcserver.classes.packet_decoder import PacketDecoder
 from mcserver.classes.packet_encoder import PacketEncoder
+from mcserver.classes.write_queue import WriteQueue
 from mcserver.events.play import PlayerLeaveEvent
 from mcserver.objects.event_handler import EventHandler
+from mcserver.objects.metrics import Metrics
 from mcserver.objects.player_registry import PlayerRegistry
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.compression import compress_packet_async, decompress_packet
 from mcserver.utils.cryptography import make_server_id, make_verify_token, Cipher
 from mcserver.utils.logger import warn, debug, error
 
 if TYPE_CHECKING:
-    from typing import List, Dict, Union, Optional
-    from anyio import SocketStream, Event
+    from typing import Deque, Dict, Union, Optional
+    from anyio import SocketStream, Event, TaskGroup
+    from mcserver.classes.chunk_streamer import ChunkStreamer
     from mcserver.events.event_base import Event as MCEvent
     from mcserver.classes.player import Player
 
@@ -37,25 +45,37 @@ class ClientConnection:
         self.client = client
         self.do_loop = True
         self.packet_decoder = PacketDecoder(packets.default_protocol_version, 0)
-        self.messages: List[bytes] = []
-        self._locks: List[
-            Dict[str,
-                 Union[
-                     str,
-                     Event,
-                     Optional[MCEvent]
-                 ]]
-        ] = []
+        self.frame_buffer = FrameBuffer()
+        self.workers = create_capacity_limiter(ServerCore.handler_workers)
+        self.write_queue = WriteQueue(ServerCore.write_high_watermark,
+                                      ServerCore.write_low_watermark)
+        # Pending `wait_for_packet` calls by packet name, oldest first
+        self._waiters: Dict[
+            str,
+            Deque[Dict[str,
+                       Union[
+                           Event,
+                           Optional[MCEvent]
+                       ]]]
+        ] = {}
         self.server_id = make_server_id()
         self.verify_token = make_verify_token()
         self.cipher = Cipher()
+        # Negative until Set Compression has been sent
+        self.compression_threshold = -1
+        self.send_lock = create_lock()
 
         self.name = ""
         self.uuid: UUID = None
-
-    @property
-    def player(self) -> Player:
-        return PlayerRegistry.get_player(self.uuid)
+        # perf_counter() at Login Start, for the login stage metrics
+        self.login_started = 0.0
+        if Metrics.enabled:
+            Metrics.track(self)
+        # Set once login succeeds
+        self.player: Optional[Player] = None
+        self.chunk_streamer: Optional[ChunkStreamer] = None
+        # Tasks that should live as long as the connection, e.g. the chunk streamer
+        self.task_group: Optional[TaskGroup] = None
 
     @property
     def protocol_version(self) -> int:
@@ -67,105 +87,240 @@ class ClientConnection:
 
     @property
     def packet_encoder(self):
-        return PacketEncoder(self.packet_decoder.protocol)
+        return PacketEncoder.for_protocol(self.packet_decoder.protocol)
 
     def __repr__(self):
         return (f"ClientConnection(loop={self.do_loop}, "
-                f"message_queue={len(self.messages)}, "
-                f"lock_queue={len(self._locks)})")
+                f"message_queue={len(self.write_queue)}, "
+                f"waiters={sum(map(len, self._waiters.values()))})")
 
     async def serve(self):
-        async with create_task_group() as tg:
-            await tg.spawn(self.serve_loop)
-            await tg.spawn(self.write_loop)
+        try:
+            async with create_task_group() as tg:
+                self.task_group = tg
+                await tg.spawn(self.serve_loop)
+                await tg.spawn(self.write_loop)
+        except Exception:  # pylint: disable=broad-except
+            # Never let one misbehaving client take down the server's task group
+            error("Connection closed after an exception", exc_info=True)
+        finally:
+            async with open_cancel_scope(shield=True):
+                await self.client.close()
 
     async def serve_loop(self):
-        data = b""
-        run_again = False
         async with create_task_group() as tg:
-            while self.do_loop:
-                await sleep(0.0001)
-                if not run_again:
-                    try:
-                        line = await self.client.receive_some(1024)
-                    except ConnectionError:
-                        line = b""
-
-                    if line == b"":
+            try:
+                await self.read_events(tg)
+            finally:
+                # Also runs when reading fails or is cancelled, or the player would never leave.
+                # Waiters are released before the task group waits for concurrent handlers.
+                async with open_cancel_scope(shield=True):
+                    await self.write_queue.close()
+                    for waiters in self._waiters.values():
+                        for waiter in waiters:
+                            await waiter["lock"].set()
+                    self._waiters.clear()
+                    if self.player is not None:
+                        # User was logged in
+                        debug("Player left, removing from game...")
                         try:
-                            warn(f"Closing connection to {self.client.server_hostname}")
-                        except TLSRequired:
-                            pass
+                            await EventHandler.handle_event(PlayerLeaveEvent("player_leave", self.player))
+                        finally:
+                            PlayerRegistry.remove_player(self.player)
 
-                        self.do_loop = False
-                        break
+    async def read_events(self, tg: TaskGroup):
+        frame = None
+        handled = 0
+        metrics = Metrics.enabled
+        while self.do_loop:
+            if frame is None:
+                try:
+                    line = await self.client.receive_some(self.frame_buffer.receive_size)
+                except ConnectionError:
+                    line = b""
 
-                    data += self.cipher.decrypt(line)
+                if line == b"":
+                    try:
+                        warn("Closing connection to %s", self.client.server_hostname)
+                    except TLSRequired:
+                        pass
 
-                try:
-                    rest_bytes, event = self.packet_decoder.decode(data)
-                    event._conn = self
-                    # debug(f"Left after parsing: {rest_bytes}")
-                except AssertionError:
-                    run_again = False
-                    continue
+                    self.do_loop = False
+                    break
+
+                if metrics:
+                    Metrics.inc("mcserver_bytes_received_total", "", len(line))
+                    start = perf_counter()
+                    self.frame_buffer.feed_decrypted(line, self.cipher)
+                    if self.cipher.decryptor:
+                        Metrics.observe("mcserver_cipher_seconds", 'direction="decrypt"', perf_counter() - start)
                 else:
-                    data = rest_bytes
-                    if data != b"":
-                        run_again = True
+                    self.frame_buffer.feed_decrypted(line, self.cipher)
+                handled = 0
 
-                debug(event)
+            try:
+                frame = self.frame_buffer.next_frame(legacy=self.protocol_state == 0)
+                if frame is None:
+                    continue
 
-                for lock in self._locks:
-                    if lock["name"] == event.event:
-                        self._locks.remove(lock)
-                        lock["result"] = event
-                        await lock["lock"].set()
-                        break
+                if self.compression_threshold >= 0:
+                    frame = decompress_packet(frame, self.compression_threshold)
 
-                if event.event == "handshake":
-                    await self.handle_msg(event)
+                if metrics:
+                    start = perf_counter()
+                    event = self.packet_decoder.decode(frame)
+                    if event is not None:
+                        labels = f'packet="{event.event}"'
+                        Metrics.observe("mcserver_decode_seconds", labels, perf_counter() - start)
+                        Metrics.inc("mcserver_packets_received_total", labels)
                 else:
-                    await tg.spawn(self.handle_msg, event)
+                    event = self.packet_decoder.decode(frame)
+            except Exception as e:  # pylint: disable=broad-except
+                # Malformed frames, or a protocol this server does not speak (e.g. a newer
+                # client's server list ping): nothing after it can be read, so drop the client
+                warn("Dropping connection to %s after bad input: %s", self.address, e)
+                self.do_loop = False
+                break
+            if event is None:
+                continue
+            event._conn = self
 
-            for lock in self._locks:
-                await lock["lock"].set()
-            if self.packet_decoder.status == 3:
-                # User was logged in
-                debug("Player left, removing from game...")
-                await EventHandler.handle_event(PlayerLeaveEvent("player_leave", self.player))  # TODO: Use PlayerLeaveEvent
-                PlayerRegistry.players.remove(self.player)
+            debug("Received %r", event)
+
+            waiters = self._waiters.get(event.event)
+            if waiters:
+                waiter = waiters.popleft()
+                if not waiters:
+                    del self._waiters[event.event]
+                waiter["result"] = event
+                await waiter["lock"].set()
+
+            # Events are handled in order on this task, only handlers that opted in
+            # (e.g. to use `wait_for_packet`) run concurrently in the worker pool
+            if EventHandler.is_concurrent(event):
+                await self.workers.acquire_on_behalf_of(event)
+                await tg.spawn(self.handle_concurrent, event)
+            else:
+                await self.handle_msg(event)
+
+            # Let other connections run during long pipelined bursts
+            handled += 1
+            if handled == ServerCore.dispatch_batch:
+                handled = 0
+                await sleep(0)
 
     async def handle_msg(self, event: MCEvent):
+        start = perf_counter() if Metrics.enabled else 0.0
         try:
             await EventHandler.handle_event(event)
         except Exception:  # pylint: disable=broad-except
-            error(f"Exception occurred:\n{format_exc()}")
+            error("Exception occurred", exc_info=True)
+        if start:
+            Metrics.observe("mcserver_handler_seconds", f'event="{event.event}"', perf_counter() - start)
+
+    async def handle_concurrent(self, event: MCEvent):
+        try:
+            await self.handle_msg(event)
+        finally:
+            await self.workers.release_on_behalf_of(event)
 
     async def write_loop(self):
-        while self.do_loop:
-            if self.messages:
-                msg = self.messages.pop(0)
-                debug(f"Sending to client: {msg}")
-                await self.client.send_all(msg)
+        while True:
+            msg = await self.write_queue.get()
+            if not msg:
+                break
+            debug("Sending %d bytes to %s", len(msg), self.address)
+            # Everything queued since the last write is encrypted in one call. Packets are queued
+            # in plain text: the client only enables encryption after reading everything sent before
+            if Metrics.enabled:
+                Metrics.inc("mcserver_bytes_sent_total", "", len(msg))
+                Metrics.inc("mcserver_writes_total")
+                start = perf_counter()
+                data = self.cipher.encrypt_into(msg)
+                if self.cipher.encryptor:
+                    Metrics.observe("mcserver_cipher_seconds", 'direction="encrypt"', perf_counter() - start)
             else:
-                await sleep(0.00001)  # Allow other tasks to run
+                data = self.cipher.encrypt_into(msg)
+            try:
+                await self.client.send_all(data)
+            except ConnectionError:
+                # Client went away mid-write, e.g. while chunks were streaming, the read side sees it too
+                await self.write_queue.close()
+                break
+            await self.write_queue.done(len(msg))
 
-    async def wait_for_packet(self, packet_name: str) -> Event:
-        lock = {
-            "name": packet_name,
+    async def wait_for_packet(self, packet_name: str, timeout: Optional[float] = None) -> Optional[MCEvent]:
+        # Resolves to None if the connection closes first, raises TimeoutError
+        # after `timeout` (default ServerCore.packet_wait_timeout) seconds
+        waiter = {
             "lock": create_event(),
             "result": None
         }
+        waiters = self._waiters.get(packet_name)
+        if waiters is None:
+            waiters = self._waiters[packet_name] = deque()
+        waiters.append(waiter)
+
+        try:
+            async with fail_after(ServerCore.packet_wait_timeout if timeout is None else timeout):
+                await waiter["lock"].wait()
+        except TimeoutError:
+            if waiter["result"] is not None:
+                # Answered just as the deadline hit
+                return waiter["result"]
+            waiters = self._waiters.get(packet_name)
+            if waiters is not None and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[packet_name]
+            raise
+
+        return waiter["result"]
+
+    async def send_encoded(self, data: bytes, packet_name: str = "encoded"):
+        # `data` is a complete frame from PacketEncoder.encode, only valid before compression is enabled
+        if Metrics.enabled:
+            Metrics.inc("mcserver_packets_sent_total", f'packet="{packet_name}"')
+        await self.write_queue.put(data)
+
+    async def send_frame(self, data: bytes, packet_name: str = "frame", wait: bool = True):
+        # `data` is already framed for this connection's compression state, e.g. by Broadcaster.
+        # See WriteQueue.put for `wait`.
+        if Metrics.enabled:
+            Metrics.inc("mcserver_packets_sent_total", f'packet="{packet_name}"')
+        if not self.send_lock.locked():
+            # No packet is being compressed, nothing can be queued ahead of this one
+            await self.write_queue.put(data, wait)
+            return
+
+        async with self.send_lock:
+            await self.write_queue.put(data, False)
+        if wait:
+            await self.write_queue.wait_writable()
 
-        self._locks.append(lock)
-        await lock["lock"].wait()
+    async def send_packet(self, packet_name: str, *args) -> int:
+        # Returns the size of the queued frame
+        start = perf_counter() if Metrics.enabled else 0.0
+        if start:
+            Metrics.inc("mcserver_packets_sent_total", f'packet="{packet_name}"')
 
-        return lock["result"]
+        if self.compression_threshold < 0:
+            data = self.packet_encoder.encode(packet_name, args)
+            if start:
+                Metrics.observe("mcserver_encode_seconds", f'packet="{packet_name}"', perf_counter() - start)
+            await self.write_queue.put(data)
+            return len(data)
 
-    def send_packet(self, packet_name: str, *args):
-        self.messages.append(
-            self.cipher.encrypt(
-                self.packet_encoder.encode(packet_name, args)
-            )
-        )
+        # Compression may leave the event loop, keep packets in the order they were sent
+        payload = self.packet_encoder.encode_payload(packet_name, args)
+        async with self.send_lock:
+            data = await compress_packet_async(payload,
+                                               self.compression_threshold,
+                                               ServerCore.compression_level,
+                                               ServerCore.compression_offload_size)
+            if start:
+                Metrics.observe("mcserver_encode_seconds", f'packet="{packet_name}"', perf_counter() - start)
+            # Only queueing is ordered by the lock, waiting for the writer must not hold it
+            await self.write_queue.put(data, False)
+        await self.write_queue.wait_writable()
+        return len(data)
@@ -0,0 +1,122 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from typing import TYPE_CHECKING
+
+# MCServer
+from mcserver.utils.cryptography import UPDATE_INTO_SLACK
+from mcserver.utils.misc import unpack_varint
+
+if TYPE_CHECKING:
+    from typing import Optional
+    from mcserver.utils.cryptography import Cipher
+
+LEGACY_PING = 0xFE
+
+
+class FrameBuffer:
+    # Frames handed out by `next_frame` are views into the internal buffer
+    # and are only valid until the next call to `feed`
+
+    def __init__(self, receive_size: int = 1024, max_receive_size: int = 65536):
+        self.min_receive_size = receive_size
+        self.max_receive_size = max_receive_size
+        self.receive_size = receive_size
+
+        self._data = bytearray(receive_size * 4)
+        self._view = memoryview(self._data)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __repr__(self):
+        return (f"FrameBuffer(pending={len(self)}, "
+                f"capacity={len(self._data)}, "
+                f"receive_size={self.receive_size})")
+
+    def feed(self, data: bytes):
+        size = len(data)
+        self._reserve(size)
+        self._view[self._end:self._end + size] = data
+        self._end += size
+
+    def feed_decrypted(self, data: bytes, cipher: Cipher):
+        # Decrypts straight into the buffer instead of feeding a decrypted copy
+        self._reserve(len(data) + UPDATE_INTO_SLACK)
+        self._end += cipher.decrypt_into(data, self._view[self._end:])
+
+    def _reserve(self, size: int):
+        if self._end + size <= len(self._data):
+            return
+
+        pending = self._end - self._start
+        if pending + size <= len(self._data):
+            # Enough room once the consumed bytes are dropped
+            self._view[:pending] = self._view[self._start:self._end]
+        else:
+            # Never resize in place: views handed out earlier may still be alive
+            capacity = len(self._data)
+            while capacity < pending + size:
+                capacity *= 2
+            data = bytearray(capacity)
+            data[:pending] = self._view[self._start:self._end]
+            self._data = data
+            self._view = memoryview(data)
+
+        self._start = 0
+        self._end = pending
+
+    def _scan_legacy(self) -> int:
+        # FE 01 FA, short length, UTF-16BE "MC|PingHost", short length, payload
+        view = self._view
+        pos = self._start
+        if self._end - pos < 5:
+            return -1
+
+        header = 5 + (view[pos + 3] << 8 | view[pos + 4]) * 2
+        if self._end - pos < header + 2:
+            return -1
+
+        return header + 2 + (view[pos + header] << 8 | view[pos + header + 1])
+
+    def _consume(self, start: int, end: int) -> memoryview:
+        frame = self._view[start:end]
+        if end == self._end:
+            # Buffer drained, start filling from the front again
+            self._start = self._end = 0
+        else:
+            self._start = end
+        self.receive_size = self.min_receive_size
+        return frame
+
+    def _wait_for(self, missing: int):
+        self.receive_size = max(self.min_receive_size,
+                                min(missing, self.max_receive_size))
+
+    def next_frame(self, legacy: bool = False) -> Optional[memoryview]:
+        if self._start == self._end:
+            return None
+
+        if legacy and self._view[self._start] == LEGACY_PING:
+            length = self._scan_legacy()
+            if length == -1:
+                return None
+            if self._end - self._start < length:
+                self._wait_for(length - (self._end - self._start))
+                return None
+            return self._consume(self._start, self._start + length)
+
+        # Frame lengths are at most 3 bytes long
+        length, prefix = unpack_varint(self._view, self._start, self._end, 3)
+        if length == -1:
+            return None
+
+        start = self._start + prefix
+        if self._end - start < length:
+            self._wait_for(length - (self._end - start))
+            return None
+
+        return self._consume(start, start + length)
@@ -1,33 +1,46 @@
-import io
-import struct
+from typing import Callable, Dict, Optional, Tuple
 
+from mcserver.events.event_base import Event
 from mcserver.events.init import HandshakeEvent
 from mcserver.events.login import ConfirmEncryptionEvent, LoginStartEvent
 from mcserver.events.status import PingEvent, StatusEvent, Connect16Event
 from mcserver.objects.server_core import ServerCore
-from mcserver.utils.cryptography import decrypt_secret
 from mcserver.utils.logger import debug
+from mcserver.utils.misc import get_struct, unpack_varint
+
+DECODERS: Dict[Tuple[int, int], Callable[..., Event]] = {}
+
+
+def decodes(status: int, packet_id: int):
+    def decorator(func: Callable):
+        DECODERS[(status, packet_id)] = func
+        return func
+    return decorator
 
 
 class PacketDecoder:
     def __init__(self, protocol: int, status: int):
         self.protocol = protocol
         self.status = status
-        self.buffer: io.BytesIO = None
+        self.buffer: memoryview = None
+        self.pos = 0
 
     def read(self, fmt: str):
-        fmt = ">" + fmt
-        size = struct.calcsize(fmt)
-        vals = struct.unpack(fmt, self.buffer.read(size))
+        layout = get_struct(fmt)
+        vals = layout.unpack_from(self.buffer, self.pos)
+        self.pos += layout.size
         return vals if len(vals) != 1 else vals[0]
 
+    def read_bytes(self, size: int) -> bytes:
+        data = self.buffer[self.pos:self.pos+size].tobytes()
+        self.pos += size
+        return data
+
     def read_varint(self) -> int:
-        number = 0
-        for i in range(10):
-            b = self.read("B")
-            number |= (b & 0x7F) << 7*i
-            if not b & 0x80:
-                break
+        number, size = unpack_varint(self.buffer, self.pos)
+        if not size:
+            raise ValueError("Packet ends inside a varint")
+        self.pos += size
 
         if number & (1 << 31):
             number -= 1 << 32
@@ -36,7 +49,7 @@ class PacketDecoder:
 
     def read_string(self) -> str:
         size = self.read_varint()
-        return self.buffer.read(size).decode()
+        return self.read_bytes(size).decode()
 
     def read_position(self):
         def unpack_twos_comp(bits, number):
@@ -50,61 +63,38 @@ class PacketDecoder:
         z = unpack_twos_comp(26, (number & 0x3FFFFFF))
         return x, y, z
 
-    def decode(self, packet: bytes):
-        assert packet != b""
+    def decode(self, frame: memoryview) -> Optional[Event]:
+        self.buffer = frame
+        self.pos = 0
 
-        self.buffer = io.BytesIO(packet)
-
-        if packet[0] == 254:
+        if self.status == 0 and frame[0] == 254:
             # TODO: handle 1.6 connection attempt
-            data = self.decode_connection_16()
-            return self.buffer.read(), data
-
-        packet_length = self.read_varint()
-        pos = self.buffer.tell()
-        assert len(self.buffer.read()) >= packet_length
-        self.buffer.seek(pos)
+            return self.decode_connection_16()
 
         packet_id = self.read_varint()
-        # debug(f"Packet identifier: {packet_id}")
-        if packet_id == 0:
-            if self.status == 0:
-                data = self.decode_handshake()
-            elif self.status == 1:
-                data = self.decode_status()
-            elif self.status == 2:
-                data = self.decode_start_login()
-        elif packet_id == 1:
-            if self.status == 1:
-                data = self.decode_ping()
-            elif self.status == 2:
-                data = self.decode_encryption()
-
-        try:
-            data
-        except NameError:
-            debug(packet)
-            raise Exception(f"Unhandled packet ID {packet_id} with data {self.buffer.read()} "
-                            f"while in state {self.status}")
-
-        # Seek in case we leave some data by accident
-        self.buffer.seek(pos+packet_length)
-        return self.buffer.read(), data  # read the buffer to return remaining bytes
+        decoder = DECODERS.get((self.status, packet_id))
+        if decoder is None:
+            # Frames are already delimited, so unknown packets are simply dropped
+            debug("Skipping unhandled packet ID %d (%d bytes) while in state %d", packet_id, len(frame), self.status)
+            return None
+
+        return decoder(self)
 
     def decode_connection_16(self):
-        ident = self.buffer.read(1)
-        payload = self.buffer.read(1)
-        sub_ident = self.buffer.read(1)
+        ident = self.read_bytes(1)
+        payload = self.read_bytes(1)
+        sub_ident = self.read_bytes(1)
         size = self.read("h")
-        enc = self.buffer.read(size*2)
+        enc = self.read_bytes(size*2)
         ping_host = enc.decode("UTF-16BE")
         size_remain = self.read("h")
-        protocol = self.buffer.read(1)[0]
+        protocol = self.read("B")
         len_host = self.read("h") * 2
-        hostname = self.buffer.read(len_host).decode("UTF-16BE")
+        hostname = self.read_bytes(len_host).decode("UTF-16BE")
         port = self.read("i")
         return Connect16Event("connect_16", protocol, hostname, port)
 
+    @decodes(0, 0x00)
     def decode_handshake(self):
         protocol = self.read_varint()
         if protocol in ServerCore.supported_protocols():
@@ -116,18 +106,21 @@ class PacketDecoder:
         self.status = self.read_varint()
         return HandshakeEvent("handshake", hostname, port)
 
+    @decodes(1, 0x00)
     def decode_status(self):
         return StatusEvent("status")
 
+    @decodes(1, 0x01)
     def decode_ping(self):
         return PingEvent("ping", self.read("q"))
 
+    @decodes(2, 0x00)
     def decode_start_login(self):
         return LoginStartEvent("login_start", self.read_string())
 
+    @decodes(2, 0x01)
     def decode_encryption(self):
-        secret = decrypt_secret(ServerCore.keypair,
-                                self.buffer.read(self.read_varint()))
-        verify = decrypt_secret(ServerCore.keypair,
-                                self.buffer.read(self.read_varint()))
+        # Decrypted by the login_encryption handler, off the event loop
+        secret = self.read_bytes(self.read_varint())
+        verify = self.read_bytes(self.read_varint())
         return ConfirmEncryptionEvent("login_encryption", secret, verify)
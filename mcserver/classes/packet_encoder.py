@@ -1,28 +1,56 @@
-import io
 import json
-import struct
+import zlib
+from typing import Callable, Dict, Iterable, Optional, Sequence
+from uuid import UUID
 
+import numpy as np
+from quarry.data import packets
+from quarry.types.nbt import TagRoot
+
+from mcserver.game.chunk_section import ChunkSection
 from mcserver.objects.server_core import ServerCore
+from mcserver.utils.chunk_data import (PROTOCOL_1_8, PROTOCOL_1_9, PROTOCOL_1_9_4, encode_column_1_7,
+                                       encode_column_1_8, encode_column_1_9)
+from mcserver.utils.misc import get_struct, pack_varint
+
+# Room kept in front of the payload for the frame length, a varint of at most 3 bytes
+LENGTH_PREFIX = 3
+
+ENCODERS: Dict[str, Callable[..., None]] = {}
+
+
+def encodes(packet_name: str):
+    def decorator(func: Callable):
+        ENCODERS[packet_name] = func
+        return func
+    return decorator
 
 
 class PacketEncoder:
+    # Encoders hold no per-connection state, so one is shared per protocol version
+    instances: Dict[int, "PacketEncoder"] = {}
+
     def __init__(self, protocol: int):
         self.protocol = protocol
-        self.buffer: io.BytesIO = None
+        self.buffer = bytearray(LENGTH_PREFIX)
 
-    def write(self, fmt: str, args):
-        self.buffer.write(struct.pack(">"+fmt, args))
+    @classmethod
+    def for_protocol(cls, protocol: int) -> "PacketEncoder":
+        try:
+            return cls.instances[protocol]
+        except KeyError:
+            encoder = cls.instances[protocol] = cls(protocol)
+            return encoder
+
+    def write(self, fmt: str, *args):
+        self.buffer += get_struct(fmt).pack(*args)
 
     def write_varint(self, number: int):
-        if number < 0:
-            number += 1 << 32
+        self.buffer += pack_varint(number)
 
-        for i in range(10):
-            b = number & 0x7F
-            number >>= 7
-            self.write("B", b | (0x80 if number > 0 else 0))
-            if number == 0:
-                break
+    def write_play_id(self, packet_name: str):
+        # Play packet ids move around between versions, unlike the login and status ones
+        self.write_varint(packets.packet_idents[(self.protocol, "play", "downstream", packet_name)])
 
     def write_position(self, x, y, z):
         def pack_twos_comp(bits, number):
@@ -37,7 +65,7 @@ class PacketEncoder:
 
     def write_bytes(self, data: bytes):
         self.write_varint(len(data))
-        self.buffer.write(data)
+        self.buffer += data
 
     def write_string(self, text: str, encoding="utf-8"):
         self.write_bytes(text.encode(encoding))
@@ -45,37 +73,111 @@ class PacketEncoder:
     def write_json(self, data: dict):
         self.write_string(json.dumps(data))
 
-    def encode(self, packet_id: str, args) -> bytes:
-        self.buffer = io.BytesIO()
-
-        if packet_id == "status":
-            self.encode_status(*args)
-        elif packet_id == "pong":
-            self.encode_pong(*args)
-        elif packet_id == "encryption_start":
-            self.encode_encryption_start(*args)
-        else:
-            raise
-
-        self.buffer.seek(0)
-        data = self.buffer.read()
-
-        self.buffer = io.BytesIO()
-        self.write_varint(len(data))
-        self.buffer.seek(0)
+    def write_packet(self, packet_id: str, args):
+        try:
+            writer = ENCODERS[packet_id]
+        except KeyError:
+            raise ValueError(f"No encoder for packet {packet_id}")
 
-        return self.buffer.read() + data
+        del self.buffer[LENGTH_PREFIX:]
+        writer(self, *args)
 
+    def encode(self, packet_id: str, args) -> bytes:
+        self.write_packet(packet_id, args)
+        buffer = self.buffer
+
+        # Fill in the length right in front of the payload and hand out a single copy
+        length = pack_varint(len(buffer) - LENGTH_PREFIX)
+        start = LENGTH_PREFIX - len(length)
+        if start < 0:
+            raise ValueError(f"Packet {packet_id} is too large ({len(buffer) - LENGTH_PREFIX} bytes)")
+        buffer[start:LENGTH_PREFIX] = length
+        with memoryview(buffer) as view:
+            return view[start:].tobytes()
+
+    def encode_payload(self, packet_id: str, args) -> bytes:
+        # Packet without its length, for framing that needs the payload first (compression)
+        self.write_packet(packet_id, args)
+        with memoryview(self.buffer) as view:
+            return view[LENGTH_PREFIX:].tobytes()
+
+    @encodes("status")
     def encode_status(self, data: dict):
         self.write_varint(0)  # `status` code
         self.write_json(data)
 
+    @encodes("pong")
     def encode_pong(self, arg: int):
         self.write_varint(1)  # `pong` code
         self.write("q", arg)
 
+    @encodes("encryption_start")
     def encode_encryption_start(self, server_id: str, verify_token: bytes):
         self.write_varint(1)  # `encryption_start` code
         self.write_string(server_id)
         self.write_bytes(ServerCore.pubkey)
         self.write_bytes(verify_token)
+
+    @encodes("login_success")
+    def encode_login_success(self, uuid: UUID, username: str):
+        self.write_varint(2)  # `login_success` code
+        self.write_string(str(uuid))
+        self.write_string(username)
+
+    @encodes("set_compression")
+    def encode_set_compression(self, threshold: int):
+        self.write_varint(3)  # `set_compression` code
+        self.write_varint(threshold)
+
+    @encodes("chat_message")
+    def encode_chat_message(self, message: dict, position: int = 0):
+        self.write_play_id("chat_message")
+        self.write_json(message)
+        if self.protocol >= 47:
+            # Chat box, system message or action bar, added in 1.8
+            self.write("b", position)
+
+    @encodes("chunk_data")
+    def encode_chunk_data(self, x: int, z: int, sections: Sequence[Optional[ChunkSection]],
+                          biomes: Optional[np.ndarray] = None, sky_light: bool = True,
+                          block_entities: Iterable[TagRoot] = ()):
+        # Sections left as None are not sent, biomes are only sent (and required) for full chunks
+        self.write_play_id("chunk_data")
+        self.write("ii?", x, z, biomes is not None)
+        if self.protocol < PROTOCOL_1_8:
+            mask, add_mask, data = encode_column_1_7(sections, biomes, sky_light, ServerCore.compression_level)
+            self.write("HHi", mask, add_mask, len(data))
+            self.buffer += data
+            return
+
+        if self.protocol < PROTOCOL_1_9:
+            mask, data = encode_column_1_8(sections, biomes, sky_light)
+            self.write("H", mask)
+        else:
+            mask, data = encode_column_1_9(sections, self.protocol, biomes, sky_light)
+            self.write_varint(mask)
+        self.write_bytes(data)
+
+        if self.protocol >= PROTOCOL_1_9_4:
+            block_entities = list(block_entities)
+            self.write_varint(len(block_entities))
+            for block_entity in block_entities:
+                self.buffer += block_entity.to_bytes()
+
+    @encodes("unload_chunk")
+    def encode_unload_chunk(self, x: int, z: int):
+        if self.protocol >= PROTOCOL_1_9:
+            self.write_play_id("unload_chunk")
+            self.write("ii", x, z)
+            return
+
+        # Before 1.9 a full chunk without any sections unloads it
+        self.write_play_id("chunk_data")
+        self.write("ii?", x, z, True)
+        if self.protocol < PROTOCOL_1_8:
+            data = zlib.compress(b"")
+            self.write("HHi", 0, 0, len(data))
+            self.buffer += data
+        else:
+            self.write("H", 0)
+            self.write_varint(0)
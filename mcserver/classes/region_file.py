@@ -0,0 +1,132 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+import gzip
+import mmap
+import os
+from time import time
+from typing import TYPE_CHECKING
+import zlib
+
+# External Libraries
+import numpy as np
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+SECTOR_SIZE = 4096
+# Location table then timestamp table, one big-endian int per chunk each
+HEADER_SECTORS = 2
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+
+
+class RegionFile:
+    # An Anvil .mca file covering 32x32 chunks. The file is memory-mapped and only the header
+    # is parsed up front, chunk payloads are sliced out of the map when asked for. Writes go
+    # through the file descriptor, the map is recreated once the file has grown past it.
+
+    def __init__(self, path: str, create: bool = False):
+        self.path = path
+        flags = os.O_RDWR | (os.O_CREAT if create else 0)
+        self.fd = os.open(path, flags, 0o644)
+        size = os.fstat(self.fd).st_size
+        if size < HEADER_SECTORS * SECTOR_SIZE:
+            os.ftruncate(self.fd, HEADER_SECTORS * SECTOR_SIZE)
+            size = HEADER_SECTORS * SECTOR_SIZE
+
+        self.map = mmap.mmap(self.fd, size, access=mmap.ACCESS_READ)
+        self.mapped_size = size
+        self.size = size
+        header = np.frombuffer(self.map, dtype=">u4", count=2 * 1024)
+        self.offsets = (header[:1024] >> 8).astype(np.int64)
+        self.sector_counts = (header[:1024] & 0xFF).astype(np.int64)
+        self.timestamps = header[1024:].astype(np.int64)
+        del header
+
+        # One byte per sector of the file, non-zero while a chunk (or the header) occupies it
+        self.used = bytearray(-(-size // SECTOR_SIZE))
+        self.used[:HEADER_SECTORS] = b"\x01" * HEADER_SECTORS
+        for offset, count in zip(self.offsets.tolist(), self.sector_counts.tolist()):
+            if offset >= HEADER_SECTORS and count:
+                self.used[offset:offset + count] = b"\x01" * count
+
+    @staticmethod
+    def index(x: int, z: int) -> int:
+        return (x & 31) + (z & 31) * 32
+
+    def has_chunk(self, x: int, z: int) -> bool:
+        return bool(self.offsets[self.index(x, z)])
+
+    def read_chunk(self, x: int, z: int) -> Optional[bytes]:
+        # Uncompressed NBT of the chunk, or None if it was never generated
+        index = self.index(x, z)
+        offset = int(self.offsets[index])
+        if not offset:
+            return None
+        if self.size > self.mapped_size:
+            self.remap()
+
+        start = offset * SECTOR_SIZE
+        length = int.from_bytes(self.map[start:start + 4], "big")
+        if length < 1 or start + 4 + length > self.mapped_size:
+            raise Exception(f"Chunk {x}, {z} in {self.path} is corrupted")
+
+        compression = self.map[start + 4]
+        data = memoryview(self.map)[start + 5:start + 4 + length]
+        try:
+            if compression == COMPRESSION_ZLIB:
+                return zlib.decompress(data)
+            if compression == COMPRESSION_GZIP:
+                return gzip.decompress(data)
+            if compression == COMPRESSION_NONE:
+                return bytes(data)
+        finally:
+            data.release()
+        raise Exception(f"Chunk {x}, {z} in {self.path} uses unknown compression {compression}")
+
+    def write_chunk(self, x: int, z: int, data: bytes, level: int = 6):
+        payload = zlib.compress(data, level)
+        payload = (len(payload) + 1).to_bytes(4, "big") + bytes((COMPRESSION_ZLIB,)) + payload
+        count = -(-len(payload) // SECTOR_SIZE)
+        if count > 255:
+            raise Exception(f"Chunk {x}, {z} is too large for a region file")
+
+        index = self.index(x, z)
+        offset = int(self.offsets[index])
+        old_count = int(self.sector_counts[index])
+        if offset:
+            self.used[offset:offset + old_count] = bytes(old_count)
+        if not offset or count > old_count:
+            offset = self.allocate(count)
+        self.used[offset:offset + count] = b"\x01" * count
+
+        os.pwrite(self.fd, payload.ljust(count * SECTOR_SIZE, b"\x00"), offset * SECTOR_SIZE)
+        self.size = max(self.size, (offset + count) * SECTOR_SIZE)
+
+        timestamp = int(time())
+        os.pwrite(self.fd, (offset << 8 | count).to_bytes(4, "big"), index * 4)
+        os.pwrite(self.fd, timestamp.to_bytes(4, "big"), SECTOR_SIZE + index * 4)
+        self.offsets[index] = offset
+        self.sector_counts[index] = count
+        self.timestamps[index] = timestamp
+
+    def allocate(self, count: int) -> int:
+        # First free run that fits, otherwise the end of the file
+        offset = self.used.find(bytes(count), HEADER_SECTORS)
+        if offset == -1:
+            offset = len(self.used)
+        if offset + count > len(self.used):
+            self.used.extend(bytes(offset + count - len(self.used)))
+        return offset
+
+    def remap(self):
+        self.map.close()
+        self.map = mmap.mmap(self.fd, self.size, access=mmap.ACCESS_READ)
+        self.mapped_size = self.size
+
+    def close(self):
+        self.map.close()
+        os.close(self.fd)
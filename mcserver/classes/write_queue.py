@@ -0,0 +1,86 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from collections import deque
+from typing import TYPE_CHECKING
+
+# External Libraries
+from anyio import create_event
+
+if TYPE_CHECKING:
+    from typing import Deque
+
+
+class WriteQueue:
+    # `buffered` counts both queued bytes and bytes handed to the writer that
+    # have not been reported back through `done` yet. Producers are paused once
+    # it reaches the high watermark and resumed when it drops to the low one.
+
+    def __init__(self, high_watermark: int, low_watermark: int):
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.pending: Deque[bytes] = deque()
+        self.buffered = 0
+        self.closed = False
+        self.paused = False
+        self._readable = create_event()
+        self._writable = create_event()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __repr__(self):
+        return (f"WriteQueue(pending={len(self.pending)}, "
+                f"buffered={self.buffered}, "
+                f"paused={self.paused})")
+
+    async def put(self, data: bytes, wait: bool = True):
+        # With wait=False the producer is not paused here, it calls `wait_writable` itself
+        # once it is done queueing, e.g. after queueing a broadcast for every recipient
+        if self.closed:
+            return
+
+        self.pending.append(data)
+        self.buffered += len(data)
+        if not self._readable.is_set():
+            await self._readable.set()
+
+        if wait:
+            await self.wait_writable()
+
+    async def wait_writable(self):
+        if self.buffered >= self.high_watermark:
+            await self.drain()
+
+    async def drain(self):
+        while self.buffered > self.low_watermark and not self.closed:
+            self.paused = True
+            self._writable.clear()
+            await self._writable.wait()
+
+    async def get(self) -> bytes:
+        # Returns everything queued so far as a single write, or b"" once closed
+        while not self.pending:
+            if self.closed:
+                return b""
+            self._readable.clear()
+            await self._readable.wait()
+
+        if len(self.pending) == 1:
+            data = self.pending.popleft()
+        else:
+            data = b"".join(self.pending)
+            self.pending.clear()
+        return data
+
+    async def done(self, size: int):
+        self.buffered -= size
+        if self.paused and self.buffered <= self.low_watermark:
+            self.paused = False
+            await self._writable.set()
+
+    async def close(self):
+        self.closed = True
+        await self._readable.set()
+        await self._writable.set()
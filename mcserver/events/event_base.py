@@ -12,6 +12,11 @@ class Event:
         self.event = event
         self.args = args
         self._conn: ClientConnection = None
+        # Set by a listener to stop the handlers after it
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
 
     def __repr__(self):
         return f"{self.__class__.__name__}({', '.join(map(repr, self.args))})"
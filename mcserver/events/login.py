@@ -10,5 +10,8 @@ class LoginStartEvent(Event):
 class ConfirmEncryptionEvent(Event):
     def __init__(self, event: str, *args):
         super().__init__(event, *args)
-        self.secret: bytes = args[0]
-        self.verify: bytes = args[1]
+        self.encrypted_secret: bytes = args[0]
+        self.encrypted_verify: bytes = args[1]
+        # Filled in once the login_encryption handler has decrypted them
+        self.secret: bytes = None
+        self.verify: bytes = None
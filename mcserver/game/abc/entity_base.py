@@ -5,22 +5,70 @@ from abc import ABC
 import numpy as np
 
 # MCServer
-from mcserver.utils.misc import get_free_id
+from mcserver.objects.entity_store import EntityStore
+from mcserver.objects.spatial_index import SpatialIndex
 
 
 class Spawnable(ABC):
+    # Thin view over row `id` of the EntityStore, rows are reused once an entity is removed.
+    # position/rotation/velocity are views into the store, copy them to keep them around.
+    # Changing the position in place needs a SpatialIndex.update afterwards
     def __init__(self):
-        self.id = next(get_free_id())
-        self.position = np.array([0, 0, 0])
-        self.dimension = 0
+        self.id = EntityStore.allocate(self)
+        SpatialIndex.add(self.id)
+
+    @property
+    def position(self) -> np.ndarray:
+        return EntityStore.positions[self.id]
+
+    @position.setter
+    def position(self, value):
+        EntityStore.positions[self.id] = value
+        SpatialIndex.update(self.id)
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return EntityStore.velocities[self.id]
+
+    @velocity.setter
+    def velocity(self, value):
+        EntityStore.velocities[self.id] = value
+
+    @property
+    def dimension(self) -> int:
+        return int(EntityStore.dimensions[self.id])
+
+    @dimension.setter
+    def dimension(self, value: int):
+        SpatialIndex.remove(self.id)
+        EntityStore.dimensions[self.id] = value
+        SpatialIndex.add(self.id)
+
+    def remove(self):
+        SpatialIndex.remove(self.id)
+        EntityStore.free(self.id)
 
 
 class EntityBase(Spawnable):
     def __init__(self):
         super().__init__()
-        self.rotation = np.array([0, 0])
         self.metadata = {}
-        self.flags = 0
+
+    @property
+    def rotation(self) -> np.ndarray:
+        return EntityStore.rotations[self.id]
+
+    @rotation.setter
+    def rotation(self, value):
+        EntityStore.rotations[self.id] = value
+
+    @property
+    def flags(self) -> int:
+        return int(EntityStore.flags[self.id])
+
+    @flags.setter
+    def flags(self, value: int):
+        EntityStore.flags[self.id] = value
 
     def __repr__(self):
         return f"{self.__class__.__name__}(position={self.position}, rotation={self.rotation})"
@@ -0,0 +1,27 @@
+# External Libraries
+import numpy as np
+
+SECTION_VOLUME = 16 * 16 * 16
+
+
+class ChunkSection:
+    # A 16x16x16 slice of a chunk, arrays are indexed y * 256 + z * 16 + x like on the wire.
+    # `blocks` holds global block state ids of the protocol it is sent to: id << 4 | meta
+    # up to 1.12, the flattened ids from 1.13 on.
+    def __init__(self, blocks: np.ndarray = None, block_light: np.ndarray = None, sky_light: np.ndarray = None):
+        self.blocks = np.zeros(SECTION_VOLUME, dtype=np.uint32) if blocks is None else blocks
+        self.block_light = np.zeros(SECTION_VOLUME, dtype=np.uint8) if block_light is None else block_light
+        self.sky_light = np.full(SECTION_VOLUME, 15, dtype=np.uint8) if sky_light is None else sky_light
+
+    @staticmethod
+    def index(x: int, y: int, z: int) -> int:
+        return (y & 15) << 8 | (z & 15) << 4 | (x & 15)
+
+    def get_block(self, x: int, y: int, z: int) -> int:
+        return int(self.blocks[self.index(x, y, z)])
+
+    def set_block(self, x: int, y: int, z: int, state: int):
+        self.blocks[self.index(x, y, z)] = state
+
+    def is_empty(self) -> bool:
+        return not self.blocks.any()
@@ -0,0 +1,248 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+# External Libraries
+import numpy as np
+
+# MCServer
+from mcserver.game.chunk_section import ChunkSection
+from mcserver.utils.chunk_data import PROTOCOL_1_13
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Type, Union
+
+# Generators work on indices into this table, converted to block states per protocol when sent
+BLOCKS = ("air", "stone", "grass_block", "dirt", "bedrock", "water", "sand", "gravel")
+AIR, STONE, GRASS_BLOCK, DIRT, BEDROCK, WATER, SAND, GRAVEL = range(len(BLOCKS))
+# id << 4 | meta up to 1.12, flattened default states from 1.13
+LEGACY_STATES = np.array([0, 1 << 4, 2 << 4, 3 << 4, 7 << 4, 9 << 4, 12 << 4, 13 << 4], dtype=np.uint32)
+FLAT_STATES = np.array([0, 1, 9, 10, 33, 34, 66, 68], dtype=np.uint32)
+# Names and numeric ids accepted in generator-settings
+BLOCK_NAMES = {**{name: i for i, name in enumerate(BLOCKS)}, "grass": GRASS_BLOCK,
+               **{str(state >> 4): i for i, state in enumerate(LEGACY_STATES.tolist())}}
+
+BIOME_OCEAN = 0
+BIOME_PLAINS = 1
+BIOME_BEACH = 16
+# Biome names accepted in generator-settings, 1.13 names and the older ones they replaced
+BIOME_NAMES = {"ocean": BIOME_OCEAN, "plains": BIOME_PLAINS, "desert": 2, "mountains": 3, "extreme_hills": 3,
+               "forest": 4, "taiga": 5, "swamp": 6, "swampland": 6, "river": 7, "nether": 8, "hell": 8,
+               "the_end": 9, "sky": 9, "frozen_ocean": 10, "frozen_river": 11, "snowy_tundra": 12,
+               "ice_flats": 12, "snowy_mountains": 13, "ice_mountains": 13, "mushroom_fields": 14,
+               "mushroom_island": 14, "beach": BIOME_BEACH, "beaches": BIOME_BEACH, "jungle": 21,
+               "deep_ocean": 24, "birch_forest": 27, "dark_forest": 29, "roofed_forest": 29,
+               "savanna": 35, "badlands": 37, "mesa": 37, "the_void": 127, "void": 127}
+
+HEIGHT = 256
+SEA_LEVEL = 62
+
+GENERATORS: Dict[str, Type[TerrainGenerator]] = {}
+
+
+def generator(level_type: str):
+    # Registers a generator for a level-type, plugins can add their own the same way
+    def decorator(cls: Type[TerrainGenerator]):
+        GENERATORS[level_type.upper()] = cls
+        return cls
+    return decorator
+
+
+def resolve_seed(value: Union[int, str]) -> int:
+    # Like vanilla: numbers are used as they are, any other text through Java's String.hashCode
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        number = 0
+        for char in value:
+            number = (31 * number + ord(char)) & 0xFFFFFFFF
+        return number - (1 << 32) if number >= 1 << 31 else number
+
+
+class GeneratedChunk:
+    # Block indices into BLOCKS as (y, z, x), so a section is a plain 16 layer slice
+    def __init__(self, x: int, z: int, blocks: np.ndarray, biomes: np.ndarray):
+        self.x = x
+        self.z = z
+        self.blocks = blocks
+        self.biomes = biomes
+
+    @property
+    def heightmap(self) -> np.ndarray:
+        # Lowest y with only air above it, by z * 16 + x
+        solid = self.blocks != AIR
+        return np.where(solid.any(axis=0), HEIGHT - solid[::-1].argmax(axis=0), 0).ravel()
+
+    def to_sections(self, protocol: int) -> List[Optional[ChunkSection]]:
+        states = (FLAT_STATES if protocol >= PROTOCOL_1_13 else LEGACY_STATES)[self.blocks]
+        # No light sources yet: full sky light above the ground, none below it
+        sky_light = np.where(np.arange(HEIGHT)[:, None] >= self.heightmap, 15, 0).astype(np.uint8)
+        non_empty = (self.blocks != AIR).reshape(16, -1).any(axis=1).tolist()
+
+        sections = []
+        for y, present in enumerate(non_empty):
+            if present:
+                sections.append(ChunkSection(states[y * 16:y * 16 + 16].ravel(),
+                                             sky_light=sky_light[y * 16:y * 16 + 16].ravel()))
+            else:
+                sections.append(None)
+        return sections
+
+
+class TerrainGenerator(ABC):
+    # Runs inside the generator processes, `generate` may only depend on the seed and settings
+    # so every process produces the same chunk for the same position
+    def __init__(self, seed: int, settings: str, structures: bool):
+        self.seed = seed
+        self.settings = settings
+        self.structures = structures
+
+    @abstractmethod
+    def generate(self, x: int, z: int) -> GeneratedChunk:
+        pass
+
+
+@generator("FLAT")
+class FlatGenerator(TerrainGenerator):
+    # Superflat presets: "[version;]layers[;biome[;structures]]", layers like 2*minecraft:dirt
+    default_preset = "minecraft:bedrock,2*minecraft:dirt,minecraft:grass_block;1"
+
+    def __init__(self, seed: int, settings: str, structures: bool):
+        super().__init__(seed, settings, structures)
+        parts = (settings or self.default_preset).split(";")
+        if parts[0].isdecimal() and len(parts) > 1:
+            parts = parts[1:]
+
+        layers: List[int] = []
+        for layer in filter(None, parts[0].split(",")):
+            count, separator, name = layer.partition("*")
+            if not separator:
+                # Pre-1.9 presets write 2x3 instead
+                count, separator, name = layer.partition("x")
+                if not separator or not count.isdecimal():
+                    count, name = "", layer
+            name = name[len("minecraft:"):] if name.startswith("minecraft:") else name
+            name = name.split(":")[0]
+            if name not in BLOCK_NAMES:
+                raise Exception(f"Unknown block {name} in generator-settings")
+            layers += [BLOCK_NAMES[name]] * int(count or 1)
+        if len(layers) > HEIGHT:
+            raise Exception("generator-settings has more layers than the world is high")
+
+        column = np.full(HEIGHT, AIR, dtype=np.uint8)
+        column[:len(layers)] = layers
+        biome = self.parse_biome(parts[1]) if len(parts) > 1 and parts[1] else BIOME_PLAINS
+        # Every chunk is the same, the arrays are shared and copied when pickled
+        self.blocks = np.ascontiguousarray(np.broadcast_to(column[:, None, None], (HEIGHT, 16, 16)))
+        self.biomes = np.full(256, biome, dtype=np.uint8)
+
+    @staticmethod
+    def parse_biome(value: str) -> int:
+        # A numeric id up to 1.12, a name like minecraft:plains from 1.13
+        if value.isdecimal():
+            return int(value)
+        name = value[len("minecraft:"):] if value.startswith("minecraft:") else value
+        if name not in BIOME_NAMES:
+            raise Exception(f"Unknown biome {value} in generator-settings")
+        return BIOME_NAMES[name]
+
+    def generate(self, x: int, z: int) -> GeneratedChunk:
+        return GeneratedChunk(x, z, self.blocks, self.biomes)
+
+
+def lattice(seed: int, xs: np.ndarray, zs: np.ndarray) -> np.ndarray:
+    # Hash of each lattice point to [0, 1), the splitmix64 finalizer over wrapping uint64 math
+    h = (xs.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) ^
+         zs.astype(np.uint64) * np.uint64(0xC2B2AE3D27D4EB4F) ^
+         np.uint64(seed & 0xFFFFFFFFFFFFFFFF))
+    h ^= h >> np.uint64(30)
+    h *= np.uint64(0xBF58476D1CE4E5B9)
+    h ^= h >> np.uint64(27)
+    h *= np.uint64(0x94D049BB133111EB)
+    h ^= h >> np.uint64(31)
+    return (h >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def value_noise(seed: int, xs: np.ndarray, zs: np.ndarray, scale: float) -> np.ndarray:
+    # Smoothly interpolated random values on a grid `scale` blocks wide
+    xs = xs / scale
+    zs = zs / scale
+    x0 = np.floor(xs)
+    z0 = np.floor(zs)
+    tx = xs - x0
+    tz = zs - z0
+    tx = tx * tx * (3 - 2 * tx)
+    tz = tz * tz * (3 - 2 * tz)
+    x0 = x0.astype(np.int64)
+    z0 = z0.astype(np.int64)
+    top = lattice(seed, x0, z0) * (1 - tx) + lattice(seed, x0 + 1, z0) * tx
+    bottom = lattice(seed, x0, z0 + 1) * (1 - tx) + lattice(seed, x0 + 1, z0 + 1) * tx
+    return top * (1 - tz) + bottom * tz
+
+
+def fractal_noise(seed: int, xs: np.ndarray, zs: np.ndarray, scale: float, octaves: int) -> np.ndarray:
+    # Octaves of value noise at doubling frequency and halving weight, scaled back to [0, 1)
+    total = np.zeros(np.broadcast(xs, zs).shape)
+    weight = 1.0
+    weights = 0.0
+    for octave in range(octaves):
+        total += value_noise(seed + octave * 0x632BE5AB, xs, zs, scale) * weight
+        weights += weight
+        scale /= 2
+        weight /= 2
+    return total / weights
+
+
+@generator("DEFAULT")
+class NoiseGenerator(TerrainGenerator):
+    # Rolling hills and oceans from two layers of fractal noise, filled in per column
+    block_xs, block_zs = np.meshgrid(np.arange(16), np.arange(16))
+    ys = np.arange(HEIGHT)[:, None, None]
+
+    def heights(self, x: int, z: int) -> np.ndarray:
+        xs = self.block_xs + x * 16
+        zs = self.block_zs + z * 16
+        continents = fractal_noise(self.seed, xs, zs, 256.0, 3)
+        hills = fractal_noise(self.seed + 1, xs, zs, 48.0, 4)
+        heights = 64 + (continents - 0.5) * 64 + (hills - 0.5) * 24
+        return np.clip(heights, 1, HEIGHT - 2).astype(np.int64)
+
+    def generate(self, x: int, z: int) -> GeneratedChunk:
+        heights = self.heights(x, z)
+        ys = self.ys
+        beach = heights <= SEA_LEVEL + 1
+        top = np.where(beach, SAND, GRASS_BLOCK)
+        under = np.where(beach, SAND, DIRT)
+
+        blocks = np.where(ys < heights - 3, STONE,
+                          np.where(ys < heights, under,
+                                   np.where(ys == heights, top,
+                                            np.where(ys <= SEA_LEVEL, WATER, AIR)))).astype(np.uint8)
+        blocks[0] = BEDROCK
+
+        biomes = np.where(heights < SEA_LEVEL - 4, BIOME_OCEAN, np.where(beach, BIOME_BEACH, BIOME_PLAINS))
+        return GeneratedChunk(x, z, blocks, biomes.astype(np.uint8).ravel())
+
+
+def make_generator(level_type: str, seed: int, settings: str, structures: bool) -> TerrainGenerator:
+    # Unknown level types fall back to DEFAULT, as in vanilla
+    cls = GENERATORS.get(level_type.upper(), GENERATORS["DEFAULT"])
+    return cls(seed, settings, structures)
+
+
+# Generator of a pool process, created once by `init_worker`
+worker_generator: TerrainGenerator = None
+
+
+def init_worker(level_type: str, seed: int, settings: str, structures: bool):
+    global worker_generator
+    worker_generator = make_generator(level_type, seed, settings, structures)
+
+
+def worker_generate(x: int, z: int) -> GeneratedChunk:
+    return worker_generator.generate(x, z)
@@ -0,0 +1,72 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from random import uniform
+from typing import TYPE_CHECKING
+
+# External Libraries
+from anyio import sleep, fail_after
+from asks import Session
+from asks.errors import AsksException
+
+# MCServer
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.logger import warn
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional
+
+
+class Authenticator:
+    # One keep-alive session shared by every login, its connection count bounds
+    # the number of requests in flight to the session server
+    session: Session = None
+
+    @classmethod
+    def get_session(cls) -> Session:
+        if cls.session is None:
+            # asks asks for "Connection: close" unless told otherwise, which defeats the pool
+            cls.session = Session(ServerCore.session_server,
+                                  connections=ServerCore.auth_connections,
+                                  headers={"Connection": "keep-alive"})
+        return cls.session
+
+    @classmethod
+    def reset(cls):
+        # Drop pooled connections, e.g. after ServerCore.session_server changed
+        cls.session = None
+
+    @classmethod
+    async def has_joined(cls, username: str, server_hash: str, ip: Optional[str] = None) -> Optional[Dict]:
+        params = {
+            "username": username,
+            "serverId": server_hash
+        }
+        if ip is not None:
+            params["ip"] = ip
+
+        session = cls.get_session()
+        async with fail_after(ServerCore.auth_timeout):
+            for attempt in range(ServerCore.auth_retries + 1):
+                try:
+                    resp = await session.get(path="/session/minecraft/hasJoined", params=params)
+                except (OSError, AsksException) as e:
+                    reason = repr(e)
+                else:
+                    if resp.status_code == 200:
+                        return resp.json()
+                    if resp.status_code == 204:
+                        # Player did not join through the session server
+                        return None
+                    reason = f"HTTP {resp.status_code}"
+
+                if attempt == ServerCore.auth_retries:
+                    break
+
+                # Exponential backoff with full jitter so a login wave does not retry in lockstep
+                delay = uniform(0, ServerCore.auth_retry_delay * 2 ** attempt)
+                warn("Session server request for %s failed (%s), retrying in %.2fs", username, reason, delay)
+                await sleep(delay)
+
+        raise Exception(f"Session server unavailable: {reason}")
@@ -0,0 +1,69 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from typing import TYPE_CHECKING
+
+# MCServer
+from mcserver.classes.packet_encoder import PacketEncoder
+from mcserver.classes.player import Player
+from mcserver.objects.cluster import Cluster
+from mcserver.objects.player_registry import PlayerRegistry
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.compression import compress_packet_async
+from mcserver.utils.misc import pack_varint
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Tuple, Union
+    from mcserver.classes.client_connection import ClientConnection
+
+
+class Broadcaster:
+    # A packet is encoded once per protocol version and framed once per compression
+    # threshold, every recipient only encrypts the shared frame with its own cipher.
+    # The frame is queued for every recipient before waiting for any of them to drain,
+    # so a slow client does not hold up the ones after it.
+
+    @classmethod
+    async def broadcast(cls, recipients: Iterable[Union[Player, ClientConnection]], packet_name: str, *args) -> int:
+        payloads: Dict[int, bytes] = {}
+        frames: Dict[Tuple[int, int], bytes] = {}
+        queued: List[ClientConnection] = []
+
+        for recipient in recipients:
+            conn = recipient.conn if isinstance(recipient, Player) else recipient
+            if conn.write_queue.closed:
+                continue
+
+            protocol = conn.protocol_version
+            threshold = conn.compression_threshold
+            frame = frames.get((protocol, threshold))
+            if frame is None:
+                payload = payloads.get(protocol)
+                if payload is None:
+                    encoder = PacketEncoder.for_protocol(protocol)
+                    payload = payloads[protocol] = encoder.encode_payload(packet_name, args)
+                if threshold < 0:
+                    frame = pack_varint(len(payload)) + payload
+                else:
+                    frame = await compress_packet_async(payload, threshold,
+                                                        ServerCore.compression_level,
+                                                        ServerCore.compression_offload_size)
+                frames[(protocol, threshold)] = frame
+
+            await conn.send_frame(frame, packet_name, wait=False)
+            queued.append(conn)
+
+        for conn in queued:
+            await conn.write_queue.wait_writable()
+        return len(queued)
+
+    @classmethod
+    async def broadcast_all(cls, packet_name: str, *args) -> int:
+        # Reaches the players of every worker when running as a cluster
+        await Cluster.publish_broadcast(packet_name, args)
+        return await cls.broadcast(PlayerRegistry.all_players(), packet_name, *args)
+
+    @classmethod
+    async def broadcast_near(cls, center, radius: float, packet_name: str, *args, dimension: int = 0) -> int:
+        return await cls.broadcast(PlayerRegistry.players_within(center, radius, dimension), packet_name, *args)
@@ -0,0 +1,182 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from collections import OrderedDict
+import os
+from threading import Lock
+from typing import TYPE_CHECKING
+
+# External Libraries
+from anyio import run_in_thread, sleep
+from quarry.types.nbt import TagRoot
+
+# MCServer
+from mcserver.classes.region_file import RegionFile
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.logger import debug, error
+
+if TYPE_CHECKING:
+    from typing import List, Optional, Set, Tuple
+
+    ChunkKey = Tuple[int, int, int]
+    RegionKey = Tuple[int, int, int]
+
+# Region folder of each dimension inside the world folder
+DIMENSION_FOLDERS = {0: "region", -1: os.path.join("DIM-1", "region"), 1: os.path.join("DIM1", "region")}
+
+
+class ChunkCache:
+    # Parsed chunks by (dimension, x, z), least recently used first. Both this and the open
+    # region files are capped, so memory does not grow with the size of the explored map.
+    # Changed chunks are only marked dirty and written by `flush_loop`, or when evicted.
+    # `flush_loop` writes from a thread, region files are only touched while holding `lock`.
+    chunks: OrderedDict = OrderedDict()
+    dirty: Set[ChunkKey] = set()
+    # Taken out of `dirty` by the running flush and not written yet
+    flushing: Set[ChunkKey] = set()
+    regions: OrderedDict = OrderedDict()
+    lock = Lock()
+
+    @classmethod
+    def region_path(cls, key: RegionKey) -> str:
+        dimension, region_x, region_z = key
+        return os.path.join(ServerCore.options["level-name"], DIMENSION_FOLDERS[dimension],
+                            f"r.{region_x}.{region_z}.mca")
+
+    @classmethod
+    def get_region(cls, key: RegionKey, create: bool = False) -> Optional[RegionFile]:
+        region = cls.regions.get(key)
+        if region is not None:
+            cls.regions.move_to_end(key)
+            return region
+
+        path = cls.region_path(key)
+        if not create and not os.path.exists(path):
+            return None
+        if create:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        region = cls.regions[key] = RegionFile(path, create)
+        while len(cls.regions) > ServerCore.region_cache_size:
+            _, old = cls.regions.popitem(last=False)
+            old.close()
+        return region
+
+    @classmethod
+    def get_chunk(cls, x: int, z: int, dimension: int = 0) -> Optional[TagRoot]:
+        key = (dimension, x, z)
+        chunk = cls.chunks.get(key)
+        if chunk is not None:
+            cls.chunks.move_to_end(key)
+            return chunk
+
+        with cls.lock:
+            region = cls.get_region((dimension, x >> 5, z >> 5))
+            data = None if region is None else region.read_chunk(x, z)
+        if data is None:
+            return None
+
+        chunk = TagRoot.from_bytes(data)
+        cls.store(key, chunk)
+        return chunk
+
+    @classmethod
+    def put_chunk(cls, x: int, z: int, chunk: TagRoot, dimension: int = 0):
+        key = (dimension, x, z)
+        cls.dirty.add(key)
+        if key in cls.chunks:
+            cls.chunks[key] = chunk
+            cls.chunks.move_to_end(key)
+        else:
+            cls.store(key, chunk)
+
+    @classmethod
+    def mark_dirty(cls, x: int, z: int, dimension: int = 0):
+        key = (dimension, x, z)
+        if key not in cls.chunks:
+            raise Exception(f"Chunk {x}, {z} in dimension {dimension} is not loaded")
+        cls.dirty.add(key)
+
+    @classmethod
+    def store(cls, key: ChunkKey, chunk: TagRoot):
+        cls.chunks[key] = chunk
+        for _ in range(len(cls.chunks) - ServerCore.chunk_cache_size):
+            old_key, old = next(iter(cls.chunks.items()))
+            if old_key in cls.flushing:
+                # The flush could overwrite a newer copy written here, evicted after it instead
+                cls.chunks.move_to_end(old_key)
+                continue
+            if old_key in cls.dirty:
+                # Written now, it would be lost before the next flush otherwise
+                try:
+                    cls.write(old_key, old)
+                except Exception:  # pylint: disable=broad-except
+                    error("Could not save chunk %s", old_key, exc_info=True)
+                    cls.chunks.move_to_end(old_key)
+                    continue
+                cls.dirty.discard(old_key)
+            del cls.chunks[old_key]
+
+    @classmethod
+    def write(cls, key: ChunkKey, chunk: TagRoot):
+        dimension, x, z = key
+        data = chunk.to_bytes()
+        with cls.lock:
+            region = cls.get_region((dimension, x >> 5, z >> 5), create=True)
+            region.write_chunk(x, z, data, ServerCore.compression_level)
+
+    @classmethod
+    def take_dirty(cls) -> List[Tuple[ChunkKey, TagRoot]]:
+        # Dirty chunks grouped by region so each file is opened at most once. Changes made
+        # after this mark them dirty again for the next flush.
+        keys = sorted(cls.dirty, key=lambda key: (key[0], key[1] >> 5, key[2] >> 5))
+        cls.dirty.clear()
+        cls.flushing.update(keys)
+        return [(key, cls.chunks[key]) for key in keys]
+
+    @classmethod
+    def write_all(cls, chunks: List[Tuple[ChunkKey, TagRoot]]) -> List[ChunkKey]:
+        # Returns the chunks that could not be written
+        failed = []
+        for key, chunk in chunks:
+            try:
+                cls.write(key, chunk)
+            except Exception:  # pylint: disable=broad-except
+                error("Could not save chunk %s", key, exc_info=True)
+                failed.append(key)
+        return failed
+
+    @classmethod
+    def finish_flush(cls, failed: List[ChunkKey]):
+        cls.dirty.update(failed)
+        cls.flushing.clear()
+
+    @classmethod
+    def flush(cls) -> int:
+        chunks = cls.take_dirty()
+        cls.finish_flush(cls.write_all(chunks))
+        return len(chunks)
+
+    @classmethod
+    async def flush_loop(cls):
+        while True:
+            await sleep(ServerCore.chunk_flush_interval)
+            if cls.dirty:
+                # Serializing, compressing and writing stay off the event loop
+                chunks = cls.take_dirty()
+                # Everything is written again by the next flush if this one is interrupted
+                failed = [key for key, _ in chunks]
+                try:
+                    failed = await run_in_thread(cls.write_all, chunks)
+                finally:
+                    cls.finish_flush(failed)
+                debug("Saved %d chunks", len(chunks) - len(failed))
+
+    @classmethod
+    def close(cls):
+        cls.flush()
+        for region in cls.regions.values():
+            region.close()
+        cls.regions.clear()
+        cls.chunks.clear()
@@ -0,0 +1,236 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+import os
+import pickle
+import selectors
+import signal
+import socket
+import struct
+from tempfile import mkdtemp
+from typing import TYPE_CHECKING
+
+# External Libraries
+from anyio import run, sleep, connect_unix, create_lock, create_task_group
+
+# MCServer
+from mcserver.objects.player_registry import PlayerRegistry
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.logger import info, warn, stop_listener
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, Optional, Tuple
+    from anyio import Lock, SocketStream
+
+# Every message between the supervisor and its workers is a pickled tuple behind its length
+HEADER = struct.Struct(">I")
+
+
+def pack_message(*message: Any) -> bytes:
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(len(data)) + data
+
+
+def unpack_messages(buffer: bytearray):
+    # Yields every complete message in `buffer` and removes it from the buffer
+    while len(buffer) >= HEADER.size:
+        size, = HEADER.unpack_from(buffer)
+        if len(buffer) < HEADER.size + size:
+            break
+        data = bytes(buffer[HEADER.size:HEADER.size + size])
+        del buffer[:HEADER.size + size]
+        yield data
+
+
+class Cluster:
+    # With ServerCore.workers > 1 the main process only supervises: it forks the workers, which
+    # all accept on the server port through SO_REUSEPORT, and relays state between them over
+    # a Unix socket. Everything below `worker_id` is only used inside a worker.
+    hub_path: str = None
+    worker_id: Optional[int] = None
+    stream: SocketStream = None
+    send_lock: Lock = None
+    # Players on the other workers, by worker id
+    remote_player_counts: Dict[int, int] = {}
+
+    @classmethod
+    def player_count(cls) -> int:
+        return PlayerRegistry.player_count() + sum(cls.remote_player_counts.values())
+
+    @classmethod
+    async def send(cls, *message: Any):
+        if cls.stream is None:
+            return
+        async with cls.send_lock:
+            await cls.stream.send_all(pack_message(*message))
+
+    @classmethod
+    async def publish_broadcast(cls, packet_name: str, args: Tuple):
+        # Lets the other workers send the packet to their own players
+        await cls.send("broadcast", packet_name, args)
+
+    @classmethod
+    async def serve(cls):
+        cls.stream = await connect_unix(cls.hub_path)
+        cls.send_lock = create_lock()
+        await cls.send("hello", cls.worker_id)
+        async with create_task_group() as tg:
+            await tg.spawn(cls.sync_loop)
+            await tg.spawn(cls.receive_loop)
+
+    @classmethod
+    async def sync_loop(cls):
+        # Player counts are polled rather than pushed, status only needs them roughly current
+        sent = None
+        while True:
+            count = PlayerRegistry.player_count()
+            if count != sent:
+                await cls.send("players", cls.worker_id, count)
+                sent = count
+            await sleep(ServerCore.cluster_sync_interval)
+
+    @classmethod
+    async def receive_loop(cls):
+        from mcserver.objects.broadcaster import Broadcaster
+        buffer = bytearray()
+        while True:
+            data = await cls.stream.receive_some(65536)
+            if not data:
+                raise Exception("Lost the connection to the cluster supervisor")
+            buffer += data
+
+            for data in unpack_messages(buffer):
+                message = pickle.loads(data)
+                if message[0] == "players":
+                    cls.remote_player_counts = {worker_id: count for worker_id, count in message[1].items()
+                                                if worker_id != cls.worker_id}
+                elif message[0] == "broadcast":
+                    await Broadcaster.broadcast(PlayerRegistry.all_players(), message[1], *message[2])
+
+    @classmethod
+    def run_worker(cls, worker_id: int, start: Callable):
+        from mcserver.objects.chunk_cache import ChunkCache
+        from mcserver.objects.crypto_pool import CryptoPool
+        from mcserver.objects.terrain_pool import TerrainPool
+        cls.worker_id = worker_id
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        try:
+            run(start, backend="curio")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ChunkCache.close()
+            CryptoPool.shutdown()
+            TerrainPool.shutdown()
+
+    @classmethod
+    def fork_worker(cls, worker_id: int, start: Callable, inherited) -> int:
+        pid = os.fork()
+        if pid:
+            return pid
+
+        # Worker: drop the supervisor's sockets and never return into its code
+        status = 0
+        try:
+            for sock in inherited:
+                sock.close()
+            cls.run_worker(worker_id, start)
+        except BaseException:  # pylint: disable=broad-except
+            status = 1
+        finally:
+            # os._exit skips atexit, flush the log queue by hand
+            stop_listener()
+            os._exit(status)
+
+    @classmethod
+    def supervise(cls, start: Callable):
+        # Stopping the supervisor has to take its workers down with it
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        cls.hub_path = os.path.join(mkdtemp(prefix="mcserver-"), "cluster.sock")
+        hub = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        hub.bind(cls.hub_path)
+        hub.listen()
+
+        selector = selectors.DefaultSelector()
+        selector.register(hub, selectors.EVENT_READ)
+        # Worker connection -> (worker id, unread bytes)
+        peers: Dict[socket.socket, list] = {}
+        counts: Dict[int, int] = {}
+        children: Dict[int, int] = {}
+
+        def spawn(worker_id: int):
+            pid = cls.fork_worker(worker_id, start, [selector, hub, *peers])
+            children[pid] = worker_id
+
+        def publish(data: bytes, skip: Optional[socket.socket] = None):
+            for peer in list(peers):
+                if peer is not skip:
+                    try:
+                        peer.sendall(data)
+                    except OSError:
+                        pass
+
+        def drop(peer: socket.socket):
+            selector.unregister(peer)
+            worker_id, _ = peers.pop(peer)
+            peer.close()
+            if counts.pop(worker_id, None) is not None:
+                publish(pack_message("players", counts))
+
+        for worker_id in range(ServerCore.workers):
+            spawn(worker_id)
+        info("Started %d workers on port %d", ServerCore.workers, ServerCore.options["server-port"])
+
+        try:
+            while True:
+                for key, _ in selector.select(timeout=1.0):
+                    if key.fileobj is hub:
+                        peer, _ = hub.accept()
+                        peers[peer] = [None, bytearray()]
+                        selector.register(peer, selectors.EVENT_READ)
+                        continue
+
+                    peer = key.fileobj
+                    try:
+                        data = peer.recv(65536)
+                    except OSError:
+                        data = b""
+                    if not data:
+                        drop(peer)
+                        continue
+
+                    state = peers[peer]
+                    state[1] += data
+                    for data in unpack_messages(state[1]):
+                        message = pickle.loads(data)
+                        if message[0] == "hello":
+                            state[0] = message[1]
+                        elif message[0] == "players":
+                            counts[message[1]] = message[2]
+                            publish(pack_message("players", counts))
+                        elif message[0] == "broadcast":
+                            publish(HEADER.pack(len(data)) + data, skip=peer)
+
+                # Replace workers that died, their players are gone with them
+                while children:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                    if not pid:
+                        break
+                    worker_id = children.pop(pid)
+                    warn("Worker %d exited with status %d, restarting it", worker_id, status)
+                    spawn(worker_id)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for pid in children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+            for pid in children:
+                os.waitpid(pid, 0)
+            hub.close()
+            os.unlink(cls.hub_path)
+            os.rmdir(os.path.dirname(cls.hub_path))
@@ -0,0 +1,57 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+# External Libraries
+from anyio import run_in_thread, create_capacity_limiter
+
+# MCServer
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.cryptography import decrypt_secret, export_private_key, init_worker, worker_decrypt_secrets
+
+if TYPE_CHECKING:
+    from typing import Tuple
+    from anyio import CapacityLimiter
+
+
+class CryptoPool:
+    # RSA private key operations take long enough to stall every other connection,
+    # so they run in ServerCore.crypto_workers threads or processes
+    limiter: CapacityLimiter = None
+    executor: ProcessPoolExecutor = None
+
+    @classmethod
+    def get_limiter(cls) -> CapacityLimiter:
+        if cls.limiter is None:
+            cls.limiter = create_capacity_limiter(ServerCore.crypto_workers)
+        return cls.limiter
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        if cls.executor is None:
+            cls.executor = ProcessPoolExecutor(ServerCore.crypto_workers,
+                                               initializer=init_worker,
+                                               initargs=(export_private_key(ServerCore.keypair),))
+        return cls.executor
+
+    @classmethod
+    def shutdown(cls):
+        if cls.executor is not None:
+            cls.executor.shutdown(wait=False)
+            cls.executor = None
+
+    @classmethod
+    def _decrypt_secrets(cls, *data: bytes) -> Tuple[bytes, ...]:
+        return tuple(decrypt_secret(ServerCore.keypair, d) for d in data)
+
+    @classmethod
+    async def decrypt_secrets(cls, *data: bytes) -> Tuple[bytes, ...]:
+        if ServerCore.crypto_processes:
+            # The thread only waits on the process, the limiter keeps one per worker
+            future = cls.get_executor().submit(worker_decrypt_secrets, *data)
+            return await run_in_thread(future.result, limiter=cls.get_limiter())
+
+        return await run_in_thread(cls._decrypt_secrets, *data, limiter=cls.get_limiter())
@@ -0,0 +1,101 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from typing import TYPE_CHECKING
+
+# External Libraries
+import numpy as np
+
+if TYPE_CHECKING:
+    from typing import List, Optional
+    from mcserver.game.abc.entity_base import Spawnable
+
+
+class EntityStore:
+    # Struct of arrays, row `i` belongs to the entity with id `i`. Entities only keep
+    # their id and read/write their row, so whole-world updates are single numpy operations
+    capacity = 0
+    positions = np.zeros((0, 3), dtype=np.float64)
+    rotations = np.zeros((0, 2), dtype=np.float32)
+    velocities = np.zeros((0, 3), dtype=np.float64)
+    flags = np.zeros(0, dtype=np.uint8)
+    dimensions = np.zeros(0, dtype=np.int8)
+    # Chunk x/z each entity is bucketed under in the SpatialIndex
+    chunks = np.zeros((0, 2), dtype=np.int32)
+    alive = np.zeros(0, dtype=np.bool_)
+
+    entities: List[Optional[Spawnable]] = []
+    # Freed ids, handed out again before the store grows
+    free_ids: List[int] = []
+    next_id = 0
+
+    @classmethod
+    def grow(cls):
+        capacity = max(64, cls.capacity * 2)
+        for name in ("positions", "rotations", "velocities", "flags", "dimensions", "chunks", "alive"):
+            old = getattr(cls, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:cls.capacity] = old
+            setattr(cls, name, new)
+        cls.entities.extend([None] * (capacity - cls.capacity))
+        cls.capacity = capacity
+
+    @classmethod
+    def allocate(cls, entity: Spawnable) -> int:
+        if cls.free_ids:
+            entity_id = cls.free_ids.pop()
+        else:
+            if cls.next_id == cls.capacity:
+                cls.grow()
+            entity_id = cls.next_id
+            cls.next_id += 1
+
+        cls.entities[entity_id] = entity
+        cls.alive[entity_id] = True
+        return entity_id
+
+    @classmethod
+    def free(cls, entity_id: int):
+        if not cls.alive[entity_id]:
+            return
+
+        cls.alive[entity_id] = False
+        cls.entities[entity_id] = None
+        cls.positions[entity_id] = 0
+        cls.rotations[entity_id] = 0
+        cls.velocities[entity_id] = 0
+        cls.flags[entity_id] = 0
+        cls.dimensions[entity_id] = 0
+        cls.chunks[entity_id] = 0
+        cls.free_ids.append(entity_id)
+
+    @classmethod
+    def count(cls) -> int:
+        return cls.next_id - len(cls.free_ids)
+
+    @classmethod
+    def alive_ids(cls) -> np.ndarray:
+        return np.flatnonzero(cls.alive[:cls.next_id])
+
+    @classmethod
+    def get_entity(cls, entity_id: int) -> Optional[Spawnable]:
+        if 0 <= entity_id < cls.next_id:
+            return cls.entities[entity_id]
+        return None
+
+    @classmethod
+    def apply_velocity(cls, delta: float = 1.0) -> np.ndarray:
+        # Moves every entity by its velocity, returns the ids that moved for SpatialIndex.update_many.
+        # Free rows have no velocity, so the whole used range is updated at once
+        velocities = cls.velocities[:cls.next_id]
+        cls.positions[:cls.next_id] += velocities * delta
+        return np.flatnonzero(velocities.any(axis=1))
+
+    @classmethod
+    def within(cls, center, radius: float, dimension: int = 0) -> np.ndarray:
+        # Ids of live entities within `radius` blocks of `center`
+        used = cls.next_id
+        offsets = cls.positions[:used] - np.asarray(center, dtype=np.float64)
+        close = np.einsum("ij,ij->i", offsets, offsets) <= radius * radius
+        return np.flatnonzero(close & cls.alive[:used] & (cls.dimensions[:used] == dimension))
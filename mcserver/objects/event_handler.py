@@ -2,70 +2,100 @@
 from __future__ import annotations
 
 # Stdlib
-from functools import wraps
+from time import perf_counter
 from typing import TYPE_CHECKING
-
-# MCServer
 from uuid import UUID
 
-import asks
-from anyio import fail_after
-from asks import Session
-from quarry.data import packets
-
+# MCServer
+from mcserver.classes.chunk_streamer import ChunkStreamer
 from mcserver.events.event_base import Event
 from mcserver.events.init import HandshakeEvent
 from mcserver.events.login import LoginStartEvent, ConfirmEncryptionEvent
+from mcserver.events.play import PlayerLeaveEvent
 from mcserver.events.status import Connect16Event, StatusEvent, PingEvent
+from mcserver.objects.authenticator import Authenticator
+from mcserver.objects.crypto_pool import CryptoPool
+from mcserver.objects.metrics import Metrics
 from mcserver.objects.player_registry import PlayerRegistry
 from mcserver.objects.server_core import ServerCore
+from mcserver.objects.status_cache import StatusCache
 from mcserver.utils.cryptography import make_digest
 from mcserver.utils.logger import info
-from mcserver.utils.misc import read_favicon
 
 if TYPE_CHECKING:
-    from typing import List, Callable, Dict, Optional
+    from typing import List, Callable, Dict, Optional, Set, Tuple
 
 
-def event(event_name: Optional[str] = None):
+def event(event_name: Optional[str] = None, concurrent: bool = False, priority: int = 0):
+    # Higher priorities run first. The server's own handler runs at priority 0, ahead of
+    # listeners of the same priority, so a listener needs a positive priority to cancel it
     def decorator(func: Callable):
-
-        _event = event_name or func.__name__
-
-        @wraps
-        def inner(*args, **kwargs):
-            return func(*args, **kwargs)
-
-        if _event not in EventHandler.listeners:
-            raise ValueError(f"Invalid event name: {_event}!"
-                             " If this is a non-standard event, make sure your dependencies loaded!")
-
-        EventHandler.listeners[_event].append(_event)
-
-        return inner
+        EventHandler.add_listener(event_name or func.__name__, func, priority)
+        if concurrent:
+            EventHandler.concurrent_events.add((event_name or func.__name__)[len("event_"):])
+        return func
     return decorator
 
 
 def register_event(event_name: str):
     EventHandler.listeners[event_name] = []
+    EventHandler.compile()
 
 
 class EventHandler:
-    listeners: Dict[str, List[Callable]] = {
+    listeners: Dict[str, List[Tuple[int, Callable]]] = {
         key: []
         for key in (
             "event_handshake", "event_status", "event_connect_16", "event_ping", "event_login_start",
-            "event_login_encryption"
+            "event_login_encryption", "event_player_leave"
         )
     }
+    # Event name (without `event_`) to every handler in call order, rebuilt when listeners change
+    dispatch: Dict[str, Tuple[Callable, ...]] = {}
+    # Events whose handlers may block on the connection, e.g. with `wait_for_packet`
+    concurrent_events: Set[str] = set()
+
+    @classmethod
+    def add_listener(cls, event_name: str, func: Callable, priority: int = 0):
+        if event_name not in cls.listeners:
+            raise ValueError(f"Invalid event name: {event_name}!"
+                             " If this is a non-standard event, make sure your dependencies loaded!")
+
+        cls.listeners[event_name].append((priority, func))
+        cls.compile()
+
+    @classmethod
+    def remove_listener(cls, event_name: str, func: Callable):
+        cls.listeners[event_name] = [(p, f) for p, f in cls.listeners[event_name] if f is not func]
+        cls.compile()
+
+    @classmethod
+    def compile(cls):
+        dispatch = {}
+        for key, listeners in cls.listeners.items():
+            handlers = []
+            builtin = getattr(cls, key, None)
+            if builtin is not None:
+                handlers.append((0, builtin))
+            handlers.extend(listeners)
+            # sorted() is stable, equal priorities keep their registration order
+            dispatch[key[len("event_"):]] = tuple(func for _, func in sorted(handlers, key=lambda h: -h[0]))
+        cls.dispatch = dispatch
+
+    @classmethod
+    def is_concurrent(cls, evt: Event) -> bool:
+        return evt.event in cls.concurrent_events
 
     @classmethod
     async def handle_event(cls, evt: Event):
-        _event = f"event_{evt.event}"
-        func = getattr(cls, _event)
-        await func(evt)
-        for listener in cls.listeners[_event]:
-            await listener(evt)
+        handlers = cls.dispatch.get(evt.event)
+        if not handlers:
+            return
+
+        for func in handlers:
+            await func(evt)
+            if evt.cancelled:
+                break
 
     # TODO:
     # Implement all events
@@ -77,39 +107,25 @@ class EventHandler:
     async def event_connect_16(cls, evt: Connect16Event):
         pass
 
+    @classmethod
+    async def event_player_leave(cls, evt: PlayerLeaveEvent):
+        pass
+
     @classmethod
     async def event_status(cls, evt: StatusEvent):
-        data = {
-            "description": {
-                "text": ServerCore.options["motd"]
-            },
-            "players": {
-                "online": PlayerRegistry.player_count(),
-                "max": ServerCore.options["max-players"]
-            },
-            "version": {
-                "name": packets.minecraft_versions.get(
-                    evt._conn.protocol_version,
-                    "???"),
-                "protocol": evt._conn.protocol_version,
-            }
-        }
-        favicon = read_favicon()
-        if favicon:
-            data["favicon"] = f"data:image/png;base64,{favicon}"
-
-        evt._conn.send_packet("status", data)
+        await evt._conn.send_encoded(StatusCache.get_response(evt._conn.protocol_version), "status")
 
     @classmethod
     async def event_ping(cls, evt: PingEvent):
-        evt._conn.send_packet("pong", evt.value)
+        await evt._conn.send_packet("pong", evt.value)
 
     @classmethod
     async def event_login_start(cls, evt: LoginStartEvent):
         evt._conn.name = evt.username
+        evt._conn.login_started = perf_counter()
 
         if ServerCore.options["online-mode"]:
-            evt._conn.send_packet(
+            await evt._conn.send_packet(
                 "encryption_start",
                 evt._conn.server_id,
                 evt._conn.verify_token
@@ -120,6 +136,15 @@ class EventHandler:
 
     @classmethod
     async def event_login_encryption(cls, evt: ConfirmEncryptionEvent):
+        start = perf_counter()
+        if Metrics.enabled:
+            # From Encryption Request until the client answered it
+            Metrics.observe("mcserver_login_stage_seconds", 'stage="client"', start - evt._conn.login_started)
+
+        evt.secret, evt.verify = await CryptoPool.decrypt_secrets(evt.encrypted_secret, evt.encrypted_verify)
+        if Metrics.enabled:
+            decrypted = perf_counter()
+            Metrics.observe("mcserver_login_stage_seconds", 'stage="decrypt"', decrypted - start)
         if evt.verify != evt._conn.verify_token:
             raise Exception("Invalid verification token!")
 
@@ -130,19 +155,34 @@ class EventHandler:
             ServerCore.pubkey
         )
 
-        url = "https://sessionserver.mojang.com/session/minecraft/hasJoined"
-        params = {
-            "username": evt._conn.name,
-            "serverId": digest
-        }
+        ip = None
         if ServerCore.options["prevent-proxy-connections"]:
-            params["ip"] = evt._conn.client.server_hostname
+            ip = evt._conn.client.server_hostname
+
+        data = await Authenticator.has_joined(evt._conn.name, digest, ip)
+        if Metrics.enabled:
+            Metrics.observe("mcserver_login_stage_seconds", 'stage="session_server"', perf_counter() - decrypted)
+        if data is None:
+            raise Exception(f"{evt._conn.name} failed to authenticate with the session server")
+        info("Session server profile: %s", data)
+        evt._conn.uuid = UUID(data["id"])
+
+        threshold = ServerCore.options["network-compression-threshold"]
+        if threshold >= 0 and evt._conn.protocol_version >= 47:
+            # Compression was added in 1.8, everything after this packet is compressed
+            await evt._conn.send_packet("set_compression", threshold)
+            evt._conn.compression_threshold = threshold
+
+        await evt._conn.send_packet("login_success", evt._conn.uuid, evt._conn.name)
+        evt._conn.packet_decoder.status = 3
+        evt._conn.player = PlayerRegistry.add_player(evt._conn)
+        if Metrics.enabled:
+            Metrics.observe("mcserver_login_stage_seconds", 'stage="total"', perf_counter() - evt._conn.login_started)
 
-        async with fail_after(ServerCore.auth_timeout):  # FIXME: Fails on curio
-            resp = await asks.get(url, params=params)
-            data = resp.json()
-            info(data)
-            evt._conn.uuid = UUID(data["id"])
+        if ServerCore.chunk_streaming:
+            evt._conn.chunk_streamer = ChunkStreamer(evt._conn)
+            await evt._conn.task_group.spawn(evt._conn.chunk_streamer.run)
+        return evt._conn.player
 
-        evt._conn.packet_decoder.status = 3
-        return PlayerRegistry.add_player(evt._conn)
+
+EventHandler.compile()
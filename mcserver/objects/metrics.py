@@ -0,0 +1,179 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from bisect import bisect_left
+from typing import TYPE_CHECKING
+from weakref import WeakSet
+
+# External Libraries
+from anyio import sleep, create_tcp_server, create_task_group
+
+# MCServer
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.logger import error, info, warn
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Tuple
+    from anyio import SocketStream
+    from mcserver.classes.client_connection import ClientConnection
+
+# Upper bounds in seconds, from a cheap decode up to a session server round trip
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> List[str]:
+        sep = "," if labels else ""
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {total}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class Metrics:
+    # Call sites check `Metrics.enabled` first, so a disabled server pays one attribute lookup.
+    # Series are keyed by metric name and then by a rendered label string
+    enabled = False
+    counters: Dict[str, Dict[str, float]] = {}
+    histograms: Dict[str, Dict[str, Histogram]] = {}
+    connections: WeakSet = WeakSet()
+    help = {
+        "mcserver_packets_received_total": "Packets decoded, by packet",
+        "mcserver_packets_sent_total": "Packets queued for sending, by packet",
+        "mcserver_bytes_received_total": "Bytes read from clients",
+        "mcserver_bytes_sent_total": "Bytes written to clients",
+        "mcserver_writes_total": "Socket writes, each may hold several packets",
+        "mcserver_decode_seconds": "Time spent in PacketDecoder.decode, by packet",
+        "mcserver_encode_seconds": "Time spent encoding and framing a packet, by packet",
+        "mcserver_handler_seconds": "Time spent in EventHandler.handle_event, by event",
+        "mcserver_cipher_seconds": "Time spent in AES/CFB8, by direction",
+        "mcserver_login_stage_seconds": "Time spent per login stage",
+        "mcserver_connections": "Open client connections",
+        "mcserver_write_queue_bytes": "Bytes waiting in write queues",
+        "mcserver_write_queue_max_bytes": "Largest single write queue",
+    }
+
+    @classmethod
+    def setup(cls):
+        cls.enabled = ServerCore.metrics_enabled
+
+    @classmethod
+    def inc(cls, name: str, labels: str = "", value: float = 1):
+        series = cls.counters.get(name)
+        if series is None:
+            series = cls.counters[name] = {}
+        series[labels] = series.get(labels, 0) + value
+
+    @classmethod
+    def observe(cls, name: str, labels: str, value: float):
+        series = cls.histograms.get(name)
+        if series is None:
+            series = cls.histograms[name] = {}
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram()
+        histogram.observe(value)
+
+    @classmethod
+    def track(cls, conn: ClientConnection):
+        cls.connections.add(conn)
+
+    @classmethod
+    def render(cls) -> str:
+        lines = []
+
+        def header(name: str, kind: str):
+            lines.append(f"# HELP {name} {cls.help.get(name, name)}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(cls.counters.items()):
+            header(name, "counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+        for name, series in sorted(cls.histograms.items()):
+            header(name, "histogram")
+            for labels, histogram in sorted(series.items()):
+                lines.extend(histogram.render(name, labels))
+
+        # Queue depths are read when scraped instead of being tracked on every put
+        queues = [conn.write_queue.buffered for conn in cls.connections]
+        for name, value in (("mcserver_connections", len(queues)),
+                            ("mcserver_write_queue_bytes", sum(queues)),
+                            ("mcserver_write_queue_max_bytes", max(queues, default=0))):
+            header(name, "gauge")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def dump(cls, path: str):
+        with open(path, "w") as f:
+            f.write(cls.render())
+
+    @classmethod
+    async def serve(cls):
+        # In cluster mode every worker serves on its own port: metrics_port + worker id
+        from mcserver.objects.cluster import Cluster
+        port = ServerCore.metrics_port + (Cluster.worker_id or 0)
+        async with create_task_group() as tg:
+            if ServerCore.metrics_file:
+                await tg.spawn(cls.dump_loop)
+            async with await create_tcp_server(port, "127.0.0.1") as server:
+                info("Metrics available on http://127.0.0.1:%d/metrics", port)
+                async for client in server.accept_connections():
+                    await tg.spawn(cls.handle_scrape, client)
+
+    @classmethod
+    async def dump_loop(cls):
+        from mcserver.objects.cluster import Cluster
+        path = ServerCore.metrics_file
+        if Cluster.worker_id is not None:
+            path = f"{path}.{Cluster.worker_id}"
+        while True:
+            await sleep(ServerCore.metrics_dump_interval)
+            try:
+                cls.dump(path)
+            except OSError as e:
+                warn("Could not write metrics to %s: %s", path, e)
+
+    @classmethod
+    async def handle_scrape(cls, client: SocketStream):
+        # Any request gets the metrics, this is only meant for a local scraper. Errors stay with
+        # this scrape, they must not reach the task group the game server runs in.
+        try:
+            async with client:
+                request = b""
+                while b"\r\n\r\n" not in request and len(request) < 8192:
+                    data = await client.receive_some(4096)
+                    if not data:
+                        return
+                    request += data
+
+                body = cls.render().encode()
+                await client.send_all(b"HTTP/1.1 200 OK\r\n"
+                                      b"Content-Type: text/plain; version=0.0.4\r\n"
+                                      b"Connection: close\r\n"
+                                      b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+        except OSError as e:
+            warn("Metrics scrape failed: %s", e)
+        except Exception:  # pylint: disable=broad-except
+            error("Could not serve metrics", exc_info=True)
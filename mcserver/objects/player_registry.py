@@ -7,32 +7,76 @@ from uuid import UUID
 
 # MCServer
 from mcserver.classes.player import Player
+from mcserver.objects.spatial_index import SpatialIndex
 
 if TYPE_CHECKING:
-    from typing import List, Union
+    from typing import Dict, Iterable, List, Optional, Tuple, Union
     from mcserver.classes.client_connection import ClientConnection
 
 
 class PlayerRegistry:
-    players: List[Player] = []
+    # Every lookup goes through one of these, they always hold the same players
+    players: Dict[UUID, Player] = {}
+    players_by_name: Dict[str, Player] = {}
+    players_by_entity_id: Dict[int, Player] = {}
+    # Bumped on every add and remove, for caches built from the player list
+    version = 0
 
     @classmethod
     def player_count(cls) -> int:
         return len(cls.players)
 
     @classmethod
-    def get_player(cls, uuid: UUID) -> Player:
-        return [p for p in cls.players if p.uuid == uuid][0]
+    def get_player(cls, uuid: UUID) -> Optional[Player]:
+        return cls.players.get(uuid)
+
+    @classmethod
+    def get_player_by_name(cls, name: str) -> Optional[Player]:
+        return cls.players_by_name.get(name.lower())
+
+    @classmethod
+    def get_player_by_entity_id(cls, entity_id: int) -> Optional[Player]:
+        return cls.players_by_entity_id.get(entity_id)
+
+    @classmethod
+    def all_players(cls) -> Tuple[Player, ...]:
+        # A snapshot, so callers may add or remove players while iterating
+        return tuple(cls.players.values())
+
+    @classmethod
+    def players_within(cls, center: Iterable[float], radius: float, dimension: int = 0) -> List[Player]:
+        by_entity_id = cls.players_by_entity_id
+        return [by_entity_id[entity_id] for entity_id in SpatialIndex.query_radius(center, radius, dimension).tolist()
+                if entity_id in by_entity_id]
 
     @classmethod
     def add_player(cls, player: ClientConnection) -> Player:
         player_obj = Player(player)
-        cls.players.append(player_obj)
+
+        old = cls.players.get(player_obj.uuid)
+        if old is not None:
+            # Same account logged in again, the old entry must not linger in the other indexes
+            cls.remove_player(old)
+
+        cls.players[player_obj.uuid] = player_obj
+        cls.players_by_name[player_obj.name.lower()] = player_obj
+        cls.players_by_entity_id[player_obj.entity.id] = player_obj
+        cls.version += 1
         return player_obj
 
     @classmethod
     def remove_player(cls, player: Union[Player, UUID]):
         if isinstance(player, UUID):
             player = cls.get_player(player)
+            if player is None:
+                return
 
-        cls.players.remove(player)
+        if cls.players_by_name.get(player.name.lower()) is player:
+            del cls.players_by_name[player.name.lower()]
+        if cls.players_by_entity_id.get(player.entity.id) is player:
+            del cls.players_by_entity_id[player.entity.id]
+        if cls.players.get(player.uuid) is player:
+            del cls.players[player.uuid]
+            cls.version += 1
+            # Hands the entity id back for reuse
+            player.entity.remove()
@@ -0,0 +1,130 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from hashlib import blake2b
+import struct
+from time import monotonic
+from typing import TYPE_CHECKING
+
+# External Libraries
+from anyio import create_udp_socket
+
+# MCServer
+from mcserver.objects.cluster import Cluster
+from mcserver.objects.player_registry import PlayerRegistry
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.logger import debug, info
+
+if TYPE_CHECKING:
+    from typing import Optional, Tuple
+
+# GameSpy4 query: every request starts with the magic, a type byte and a session id
+MAGIC = b"\xfe\xfd"
+TYPE_HANDSHAKE = 9
+TYPE_STAT = 0
+REQUEST = struct.Struct(">2sBi")
+TOKEN = struct.Struct(">i")
+SESSION_MASK = 0x0F0F0F0F
+
+
+class QueryServer:
+    # Challenge tokens are derived from the client address and the current time window instead
+    # of being stored, so issuing and checking one needs no table and every cluster worker
+    # accepts the tokens of the others. A token stays valid for one to two windows.
+    token_window = 30.0
+
+    # Stat replies minus their type and session id prefix, rebuilt when `key` changes
+    key: Tuple = None
+    basic_stat: bytes = b""
+    full_stat: bytes = b""
+
+    @classmethod
+    def make_token(cls, host: str, window: int) -> int:
+        digest = blake2b(f"{host}:{window}".encode(), digest_size=4, key=ServerCore.query_secret).digest()
+        return TOKEN.unpack(digest)[0]
+
+    @classmethod
+    def check_token(cls, host: str, token: int) -> bool:
+        window = int(monotonic() // cls.token_window)
+        return token == cls.make_token(host, window) or token == cls.make_token(host, window - 1)
+
+    @classmethod
+    def refresh(cls):
+        options = ServerCore.options
+        key = (
+            PlayerRegistry.version,
+            Cluster.player_count(),
+            options["motd"],
+            options["max-players"],
+            options["level-name"],
+            options["server-port"],
+            options["server-ip"]
+        )
+        if key == cls.key:
+            return
+        cls.key = key
+
+        def cstring(value) -> bytes:
+            return str(value).encode("utf-8", "replace").replace(b"\x00", b"") + b"\x00"
+
+        motd, online, max_players = cstring(options["motd"]), cstring(key[1]), cstring(options["max-players"])
+        level, host = cstring(options["level-name"]), cstring(options["server-ip"] or "0.0.0.0")
+        cls.basic_stat = (motd + b"SMP\x00" + level + online + max_players +
+                          struct.pack("<H", options["server-port"]) + host)
+
+        # Other workers only report counts, so in cluster mode the list holds local players
+        fields = (
+            (b"hostname", motd), (b"gametype", b"SMP\x00"), (b"game_id", b"MINECRAFT\x00"),
+            (b"version", cstring(ServerCore.minecraft_versions[-1])), (b"plugins", b"\x00"),
+            (b"map", level), (b"numplayers", online), (b"maxplayers", max_players),
+            (b"hostport", cstring(options["server-port"])), (b"hostip", host)
+        )
+        names = b"".join(cstring(player.name) for player in PlayerRegistry.all_players())
+        cls.full_stat = (b"splitnum\x00\x80\x00" + b"".join(name + b"\x00" + value for name, value in fields) +
+                         b"\x00\x01player_\x00\x00" + names + b"\x00")
+
+    @classmethod
+    def handle(cls, data: bytes, host: str) -> Optional[bytes]:
+        if len(data) < REQUEST.size:
+            return None
+        magic, kind, session = REQUEST.unpack_from(data)
+        if magic != MAGIC:
+            return None
+        prefix = data[2:3] + struct.pack(">i", session & SESSION_MASK)
+
+        if kind == TYPE_HANDSHAKE:
+            token = cls.make_token(host, int(monotonic() // cls.token_window))
+            return prefix + str(token).encode() + b"\x00"
+
+        if kind != TYPE_STAT or len(data) < REQUEST.size + TOKEN.size:
+            return None
+        if not cls.check_token(host, TOKEN.unpack_from(data, REQUEST.size)[0]):
+            return None
+
+        cls.refresh()
+        # Full stat requests pad the token with four more bytes
+        if len(data) >= REQUEST.size + TOKEN.size + 4:
+            return prefix + cls.full_stat
+        return prefix + cls.basic_stat
+
+    @classmethod
+    async def serve(cls):
+        # Cluster workers all bind the port, any of them can answer since they share the secret
+        port = ServerCore.options["query.port"]
+        sock = await create_udp_socket(interface=ServerCore.options["server-ip"] or "0.0.0.0", port=port,
+                                       reuse_address=ServerCore.workers > 1)
+        info("Query listening on UDP port %d", port)
+
+        try:
+            while True:
+                data, address = await sock.receive(1460)
+                try:
+                    response = cls.handle(data, address[0])
+                except Exception:  # pylint: disable=broad-except
+                    debug("Bad query packet from %s", address[0], exc_info=True)
+                    continue
+                if response is not None:
+                    await sock.send(response, *address)
+        finally:
+            await sock.close()
@@ -1,19 +1,78 @@
 # Stdlib
+import os
+from random import getrandbits
+import signal
+import socket
 from typing import List
 
 # External Libraries
-from anyio import run, create_task_group, create_tcp_server
+from anyio import run, create_task_group, create_tcp_server, receive_signals, _get_asynclib
+from anyio._networking import SocketStreamServer
 from quarry.data import packets
 
 # MCServer
 from mcserver.utils.cryptography import export_public_key, make_keypair
+from mcserver.utils.logger import info, set_level
 from mcserver.utils.misc import DEFAULT_SERVER_PROPERTIES, read_config
 
 
 class ServerCore:
-    # TODO:
-    # Refactor auth in a different object
     auth_timeout = 30
+    # Session server used by Authenticator for online-mode logins
+    session_server = "https://sessionserver.mojang.com"
+    auth_connections = 16
+    auth_retries = 3
+    auth_retry_delay = 0.5
+    # Workers for RSA decryption during login, processes instead of threads if set
+    crypto_workers = 4
+    crypto_processes = False
+    # Outgoing bytes buffered per connection before `send_packet` starts waiting
+    write_high_watermark = 1 << 20
+    write_low_watermark = 1 << 18
+    # Concurrent handlers running per connection
+    handler_workers = 8
+    # Events handled in a row before yielding to other connections
+    dispatch_batch = 32
+    # Seconds `wait_for_packet` waits for the client before giving up
+    packet_wait_timeout = 30.0
+    # Processes accepting on the server port, above 1 they share it through SO_REUSEPORT
+    # and sync player counts and broadcasts every `cluster_sync_interval` seconds
+    workers = 1
+    cluster_sync_interval = 0.5
+    # Key of the query challenge tokens, created before the cluster forks so that every
+    # worker accepts the tokens handed out by the others
+    query_secret = os.urandom(16)
+    # DEBUG logs every packet (rate limited), INFO and above are cheap
+    log_level = "INFO"
+    # Prometheus text on 127.0.0.1:metrics_port/metrics, optionally also dumped to metrics_file
+    metrics_enabled = False
+    metrics_port = 9225
+    metrics_file = None
+    metrics_dump_interval = 10.0
+    # zlib level for packets above network-compression-threshold, and the size
+    # from which they are compressed in a worker thread
+    compression_level = 6
+    compression_offload_size = 32 * 1024
+    # Parsed chunks and open region files kept in memory, least recently used go first,
+    # and seconds between writes of changed chunks
+    chunk_cache_size = 4096
+    region_cache_size = 64
+    chunk_flush_interval = 5.0
+    # Processes generating terrain per worker, by default the cores split between the workers,
+    # and seconds between re-sorting queued chunks by player distance
+    generator_workers = None
+    generator_reorder_interval = 1.0
+    # Generated chunks kept for other players and the chunk streamers, about 64 KiB each
+    generated_cache_size = 1024
+    # Sends the chunks within view-distance after login. Off until Join Game and the player
+    # position are sent too, a client cannot use the chunks without them.
+    chunk_streaming = False
+    # Chunk streaming ticks: up to chunk_bytes_per_tick per player and tick, only while that
+    # player's write queue holds less than chunk_queue_limit, generating chunk_prefetch ahead
+    chunk_tick = 0.05
+    chunk_bytes_per_tick = 1 << 17
+    chunk_queue_limit = 1 << 18
+    chunk_prefetch = 16
     options = DEFAULT_SERVER_PROPERTIES
     with open("server.properties") as fp:
         override = read_config(fp)
@@ -35,19 +94,75 @@ class ServerCore:
     def supported_protocols(cls) -> List[int]:
         return [k for k, v in packets.minecraft_versions.items() if any(v.startswith(ver) for ver in cls.minecraft_versions)]
 
+    @classmethod
+    async def create_server(cls) -> SocketStreamServer:
+        if cls.workers <= 1:
+            return await create_tcp_server(cls.options["server-port"], "0.0.0.0")
+
+        # anyio has no reuse_port option, so the listening socket is set up here. This relies on
+        # anyio internals, which is why setup.py pins anyio to an exact version.
+        raw_socket = socket.socket(socket.AF_INET)
+        raw_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        raw_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        raw_socket.bind(("0.0.0.0", cls.options["server-port"]))
+        raw_socket.listen()
+        return SocketStreamServer(_get_asynclib().Socket(raw_socket), None, True, True)
+
     @classmethod
     async def start(cls):
         from mcserver.classes.client_connection import ClientConnection
+        from mcserver.objects.chunk_cache import ChunkCache
+        from mcserver.objects.cluster import Cluster
+        from mcserver.objects.metrics import Metrics
+        from mcserver.objects.query_server import QueryServer
+        from mcserver.objects.terrain_pool import TerrainPool
+        Metrics.setup()
         async with create_task_group() as tg:
-            async with await create_tcp_server(cls.options["server-port"], "0.0.0.0") as server:
+            await tg.spawn(cls.stop_on_signal)
+            await tg.spawn(ChunkCache.flush_loop)
+            await tg.spawn(TerrainPool.serve)
+            if Cluster.worker_id is not None:
+                await tg.spawn(Cluster.serve)
+            if Metrics.enabled:
+                await tg.spawn(Metrics.serve)
+            if cls.options["enable-query"]:
+                await tg.spawn(QueryServer.serve)
+            async with await cls.create_server() as server:
                 async for client in server.accept_connections():
                     # await client.start_tls()
                     conn = ClientConnection(client)
                     await tg.spawn(conn.serve)
 
+    @classmethod
+    async def stop_on_signal(cls):
+        # SIGTERM stops the server like Ctrl-C, so the process pools are shut down after `start`.
+        # The generator processes would otherwise outlive it, holding a copy of its socket.
+        # Raised from this task rather than a signal handler, which could interrupt any other task.
+        async with receive_signals(signal.SIGTERM) as signals:
+            async for _ in signals:
+                raise KeyboardInterrupt
+
     @classmethod
     def run(cls):
+        from mcserver.objects.chunk_cache import ChunkCache
+        from mcserver.objects.cluster import Cluster
+        from mcserver.objects.crypto_pool import CryptoPool
+        from mcserver.objects.terrain_pool import TerrainPool
+        set_level(cls.log_level)
+        if cls.options["level-seed"] == "":
+            # Picked before any worker is forked, so they all generate the same world
+            cls.options["level-seed"] = getrandbits(63)
+            info("No level-seed set, using %d", cls.options["level-seed"])
+        TerrainPool.check_settings()
+        if cls.workers > 1:
+            Cluster.supervise(cls.start)
+            return
+
         try:
             run(cls.start, backend="curio")
         except KeyboardInterrupt:
             pass
+        finally:
+            ChunkCache.close()
+            CryptoPool.shutdown()
+            TerrainPool.shutdown()
@@ -0,0 +1,111 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from typing import TYPE_CHECKING
+
+# External Libraries
+import numpy as np
+
+# MCServer
+from mcserver.objects.entity_store import EntityStore
+
+if TYPE_CHECKING:
+    from typing import Dict, Iterable, List, Set, Tuple
+
+
+class SpatialIndex:
+    # Entity ids bucketed by (dimension, chunk x, chunk z). An entity's current chunk lives in
+    # EntityStore.chunks, so only entities that crossed a chunk border touch the buckets
+    buckets: Dict[Tuple[int, int, int], Set[int]] = {}
+
+    @classmethod
+    def key(cls, entity_id: int) -> Tuple[int, int, int]:
+        chunk_x, chunk_z = EntityStore.chunks[entity_id].tolist()
+        return int(EntityStore.dimensions[entity_id]), chunk_x, chunk_z
+
+    @classmethod
+    def insert(cls, key: Tuple[int, int, int], entity_id: int):
+        bucket = cls.buckets.get(key)
+        if bucket is None:
+            bucket = cls.buckets[key] = set()
+        bucket.add(entity_id)
+
+    @classmethod
+    def discard(cls, key: Tuple[int, int, int], entity_id: int):
+        bucket = cls.buckets.get(key)
+        if bucket is not None:
+            bucket.discard(entity_id)
+            if not bucket:
+                del cls.buckets[key]
+
+    @classmethod
+    def add(cls, entity_id: int):
+        x, _, z = EntityStore.positions[entity_id].tolist()
+        EntityStore.chunks[entity_id] = (x // 16, z // 16)
+        cls.insert(cls.key(entity_id), entity_id)
+
+    @classmethod
+    def remove(cls, entity_id: int):
+        cls.discard(cls.key(entity_id), entity_id)
+
+    @classmethod
+    def update(cls, entity_id: int):
+        # Call after changing an entity's position in place
+        x, _, z = EntityStore.positions[entity_id].tolist()
+        chunk_x, chunk_z = EntityStore.chunks[entity_id].tolist()
+        if x // 16 != chunk_x or z // 16 != chunk_z:
+            cls.remove(entity_id)
+            cls.add(entity_id)
+
+    @classmethod
+    def update_many(cls, entity_ids: np.ndarray):
+        # Rebuckets only the entities that left their chunk, e.g. the ids EntityStore.apply_velocity returns
+        if not len(entity_ids):
+            return
+
+        new = np.floor(EntityStore.positions[entity_ids][:, ::2] / 16).astype(np.int32)
+        old = EntityStore.chunks[entity_ids]
+        crossed = (new != old).any(axis=1)
+        if not crossed.any():
+            return
+
+        moved = entity_ids[crossed]
+        new = new[crossed]
+        for entity_id, dimension, old_x, old_z, new_x, new_z in zip(
+                moved.tolist(), EntityStore.dimensions[moved].tolist(),
+                *old[crossed].T.tolist(), *new.T.tolist()):
+            cls.discard((dimension, old_x, old_z), entity_id)
+            cls.insert((dimension, new_x, new_z), entity_id)
+        EntityStore.chunks[moved] = new
+
+    @classmethod
+    def chunk_range(cls, low: float, high: float) -> range:
+        return range(int(np.floor(low / 16)), int(np.floor(high / 16)) + 1)
+
+    @classmethod
+    def gather(cls, dimension: int, min_x: float, min_z: float, max_x: float, max_z: float) -> np.ndarray:
+        # Candidate ids from every chunk overlapping the box
+        buckets = cls.buckets
+        found: List[int] = []
+        for chunk_x in cls.chunk_range(min_x, max_x):
+            for chunk_z in cls.chunk_range(min_z, max_z):
+                bucket = buckets.get((dimension, chunk_x, chunk_z))
+                if bucket:
+                    found.extend(bucket)
+        return np.array(found, dtype=np.intp)
+
+    @classmethod
+    def query_radius(cls, center: Iterable[float], radius: float, dimension: int = 0) -> np.ndarray:
+        x, y, z = center
+        ids = cls.gather(dimension, x - radius, z - radius, x + radius, z + radius)
+        offsets = EntityStore.positions[ids] - (x, y, z)
+        return ids[np.einsum("ij,ij->i", offsets, offsets) <= radius * radius]
+
+    @classmethod
+    def query_box(cls, low: Iterable[float], high: Iterable[float], dimension: int = 0) -> np.ndarray:
+        low = np.asarray(low, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        ids = cls.gather(dimension, low[0], low[2], high[0], high[2])
+        positions = EntityStore.positions[ids]
+        return ids[((positions >= low) & (positions <= high)).all(axis=1)]
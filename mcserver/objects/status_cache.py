@@ -0,0 +1,93 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from os import stat
+from time import monotonic
+from typing import TYPE_CHECKING
+
+# External Libraries
+from quarry.data import packets
+
+# MCServer
+from mcserver.classes.packet_encoder import PacketEncoder
+from mcserver.objects.cluster import Cluster
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.misc import read_favicon
+
+if TYPE_CHECKING:
+    from typing import Dict, Optional, Tuple
+
+
+class StatusCache:
+    # Framed status response per protocol version, valid as long as `key` matches
+    responses: Dict[int, bytes] = {}
+    key: Tuple = None
+
+    favicon: Optional[str] = None
+    favicon_mtime: Optional[int] = None
+    favicon_checked = float("-inf")
+    # Seconds between checks of server.icon, so a ping storm does not stat it every time
+    favicon_check_interval = 1.0
+
+    @classmethod
+    def check_favicon(cls) -> Optional[int]:
+        now = monotonic()
+        if now - cls.favicon_checked >= cls.favicon_check_interval:
+            cls.favicon_checked = now
+            try:
+                mtime = stat("server.icon").st_mtime_ns
+            except OSError:
+                mtime = None
+
+            if mtime != cls.favicon_mtime:
+                cls.favicon_mtime = mtime
+                cls.favicon = read_favicon() if mtime is not None else None
+
+        return cls.favicon_mtime
+
+    @classmethod
+    def invalidate(cls):
+        cls.responses.clear()
+        cls.key = None
+        cls.favicon_checked = float("-inf")
+
+    @classmethod
+    def get_response(cls, protocol: int) -> bytes:
+        key = (
+            Cluster.player_count(),
+            ServerCore.options["motd"],
+            ServerCore.options["max-players"],
+            cls.check_favicon()
+        )
+        if key != cls.key:
+            cls.responses.clear()
+            cls.key = key
+
+        try:
+            return cls.responses[protocol]
+        except KeyError:
+            response = cls.responses[protocol] = cls.build_response(protocol)
+            return response
+
+    @classmethod
+    def build_response(cls, protocol: int) -> bytes:
+        data = {
+            "description": {
+                "text": ServerCore.options["motd"]
+            },
+            "players": {
+                "online": Cluster.player_count(),
+                "max": ServerCore.options["max-players"]
+            },
+            "version": {
+                "name": packets.minecraft_versions.get(
+                    protocol,
+                    "???"),
+                "protocol": protocol,
+            }
+        }
+        if cls.favicon:
+            data["favicon"] = f"data:image/png;base64,{cls.favicon}"
+
+        return PacketEncoder.for_protocol(protocol).encode("status", (data,))
@@ -0,0 +1,183 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from heapq import heapify, heappop, heappush
+from itertools import count
+import os
+from time import monotonic
+from typing import TYPE_CHECKING
+
+# External Libraries
+from anyio import create_event, create_queue, create_task_group, run_in_thread
+import numpy as np
+
+# MCServer
+from mcserver.game.terrain import init_worker, make_generator, resolve_seed, worker_generate
+from mcserver.objects.player_registry import PlayerRegistry
+from mcserver.objects.server_core import ServerCore
+from mcserver.utils.logger import error
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Set, Tuple
+    from anyio import Queue
+    from mcserver.game.terrain import GeneratedChunk
+
+    ChunkKey = Tuple[int, int, int]
+
+
+class TerrainPool:
+    # Chunks are generated in `worker_count` processes. Requests wait in a heap
+    # keyed on their distance to the nearest player, which is recomputed for the whole heap
+    # every `generator_reorder_interval` seconds as players move.
+    executor: ProcessPoolExecutor = None
+    # Submitted to the executor and not finished yet, at most one per dispatcher
+    futures: Set[Future] = set()
+    queue: List[Tuple[int, int, ChunkKey]] = []
+    # Chunk -> [finished event, GeneratedChunk or the exception raised], shared by every waiter
+    requests: Dict[ChunkKey, list] = {}
+    # Recently generated chunks, least recently used first, shared by every player near them
+    chunks: OrderedDict = OrderedDict()
+    # One item per queued request, lets the dispatchers sleep while the heap is empty
+    tickets: Queue = None
+    order = count()
+    reordered = 0.0
+
+    @classmethod
+    def worker_count(cls) -> int:
+        if ServerCore.generator_workers is not None:
+            return ServerCore.generator_workers
+        # Every cluster worker has its own pool, together they should not outnumber the cores
+        return max(1, (os.cpu_count() or 1) // ServerCore.workers)
+
+    @classmethod
+    def generator_args(cls) -> Tuple[str, int, str, bool]:
+        options = ServerCore.options
+        return (options["level-type"], resolve_seed(options["level-seed"]),
+                options["generator-settings"], options["generate-structures"])
+
+    @classmethod
+    def check_settings(cls):
+        # A bad level-type or generator-settings would otherwise only fail in the pool's
+        # initializer, showing up as a BrokenProcessPool on the first chunk
+        make_generator(*cls.generator_args())
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        if cls.executor is None:
+            cls.executor = ProcessPoolExecutor(cls.worker_count(),
+                                               initializer=init_worker,
+                                               initargs=cls.generator_args())
+        return cls.executor
+
+    @classmethod
+    def shutdown(cls):
+        if cls.executor is not None:
+            # Queued chunks are dropped, waiting only covers the few being generated. Cancelled
+            # by hand, shutdown(cancel_futures=True) needs Python 3.9.
+            for future in cls.futures:
+                future.cancel()
+            cls.executor.shutdown(wait=True)
+            cls.executor = None
+
+    @classmethod
+    def player_chunks(cls, dimension: int) -> np.ndarray:
+        positions = [player.entity.position[[0, 2]] for player in PlayerRegistry.all_players()
+                     if player.entity.dimension == dimension]
+        if not positions:
+            return np.zeros((0, 2), dtype=np.int64)
+        return np.floor_divide(positions, 16).astype(np.int64)
+
+    @classmethod
+    def priority(cls, key: ChunkKey) -> int:
+        # Squared distance in chunks to the closest player, requests without players come last
+        players = cls.player_chunks(key[0])
+        if not len(players):
+            return 1 << 62
+        return int((((players - key[1:]) ** 2).sum(axis=1)).min())
+
+    @classmethod
+    def reorder(cls):
+        cls.reordered = monotonic()
+        if len(cls.queue) < 2:
+            return
+
+        new_queue = []
+        for dimension in {key[0] for _, _, key in cls.queue}:
+            entries = [entry for entry in cls.queue if entry[2][0] == dimension]
+            players = cls.player_chunks(dimension)
+            if not len(players):
+                new_queue += entries
+                continue
+            chunks = np.array([key[1:] for _, _, key in entries], dtype=np.int64)
+            # Every queued chunk against every player at once, keeping the closest
+            distances = ((chunks[:, None, :] - players[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+            new_queue += [(distance, order, key) for distance, (_, order, key) in zip(distances.tolist(), entries)]
+        heapify(new_queue)
+        cls.queue = new_queue
+
+    @classmethod
+    def get_cached(cls, x: int, z: int, dimension: int = 0) -> Optional[GeneratedChunk]:
+        key = (dimension, x, z)
+        chunk = cls.chunks.get(key)
+        if chunk is not None:
+            cls.chunks.move_to_end(key)
+        return chunk
+
+    @classmethod
+    async def request(cls, x: int, z: int, dimension: int = 0) -> Optional[list]:
+        # Queues the chunk without waiting for it, returns None if it is cached already
+        key = (dimension, x, z)
+        if key in cls.chunks:
+            return None
+        request = cls.requests.get(key)
+        if request is None:
+            request = cls.requests[key] = [create_event(), None]
+            heappush(cls.queue, (cls.priority(key), next(cls.order), key))
+            await cls.tickets.put(None)
+        return request
+
+    @classmethod
+    async def generate(cls, x: int, z: int, dimension: int = 0) -> GeneratedChunk:
+        request = await cls.request(x, z, dimension)
+        if request is None:
+            return cls.get_cached(x, z, dimension)
+
+        await request[0].wait()
+        if isinstance(request[1], Exception):
+            raise request[1]
+        return request[1]
+
+    @classmethod
+    async def serve(cls):
+        cls.tickets = create_queue(0)
+        async with create_task_group() as tg:
+            for _ in range(cls.worker_count()):
+                await tg.spawn(cls.dispatch_loop)
+
+    @classmethod
+    async def dispatch_loop(cls):
+        executor = cls.get_executor()
+        while True:
+            await cls.tickets.get()
+            if monotonic() - cls.reordered >= ServerCore.generator_reorder_interval:
+                cls.reorder()
+            _, _, key = heappop(cls.queue)
+            request = cls.requests[key]
+
+            # The thread only waits on the process, there is one per dispatcher
+            future = executor.submit(worker_generate, key[1], key[2])
+            cls.futures.add(future)
+            try:
+                request[1] = cls.chunks[key] = await run_in_thread(future.result)
+                while len(cls.chunks) > ServerCore.generated_cache_size:
+                    cls.chunks.popitem(last=False)
+            except Exception as e:  # pylint: disable=broad-except
+                error("Could not generate chunk %s", key, exc_info=True)
+                request[1] = e
+            finally:
+                cls.futures.discard(future)
+            del cls.requests[key]
+            await request[0].set()
@@ -0,0 +1,153 @@
+# Future patches
+from __future__ import annotations
+
+# Stdlib
+from typing import TYPE_CHECKING
+import zlib
+
+# External Libraries
+import numpy as np
+
+# MCServer
+from mcserver.game.chunk_section import SECTION_VOLUME
+from mcserver.utils.misc import pack_varint
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Sequence, Tuple
+    from mcserver.game.chunk_section import ChunkSection
+
+# Protocols where the chunk format changed
+PROTOCOL_1_8 = 47
+PROTOCOL_1_9 = 107
+PROTOCOL_1_9_4 = 110
+PROTOCOL_1_13 = 393
+
+# Palettes above this many bits are replaced by the global palette
+MAX_PALETTE_BITS = 8
+MIN_PALETTE_BITS = 4
+
+# Where every value of a section starts when packed at some width, by width
+_layouts: Dict[int, Tuple[np.ndarray, ...]] = {}
+_VARINT_GROUPS = np.arange(5)
+_VARINT_SHIFTS = (_VARINT_GROUPS * 7).astype(np.uint32)
+_VARINT_LIMITS = np.array([1 << 7, 1 << 14, 1 << 21, 1 << 28], dtype=np.uint32)
+# Block state -> palette index scratch table, only the entries of the current palette are valid
+_palette_lookup = np.empty(1 << 16, dtype=np.uint32)
+
+
+def _layout(bits: int) -> Tuple[np.ndarray, ...]:
+    try:
+        return _layouts[bits]
+    except KeyError:
+        offsets = np.arange(SECTION_VOLUME, dtype=np.uint64) * np.uint64(bits)
+        longs = (offsets >> np.uint64(6)).astype(np.intp)
+        shifts = offsets & np.uint64(63)
+        # First value in each long, and the values whose top bits continue in the next long
+        starts = np.flatnonzero(np.diff(longs, prepend=-1))
+        spills = np.flatnonzero(shifts + np.uint64(bits) > np.uint64(64))
+        layout = _layouts[bits] = (shifts, starts, longs[spills] + 1, spills, np.uint64(64) - shifts[spills])
+        return layout
+
+
+def pack_longs(values: np.ndarray, bits: int) -> bytes:
+    # Value i takes bits i * bits onwards, counted from the low end of each big-endian long.
+    # The bit ranges never overlap, so adding the shifted values up per long is the same as OR-ing them.
+    shifts, starts, spill_longs, spills, spill_shifts = _layout(bits)
+    values = values.astype(np.uint64)
+    longs = np.add.reduceat(values << shifts, starts)
+    longs[spill_longs] += values[spills] >> spill_shifts
+    return longs.astype(">u8").tobytes()
+
+
+def pack_nibbles(values: np.ndarray) -> bytes:
+    # Two values per byte, the even index in the low half
+    return ((values[0::2] & 15) | (values[1::2] << 4)).astype(np.uint8).tobytes()
+
+
+def pack_varints(values: np.ndarray) -> bytes:
+    # Varints of many non-negative ints at once: split into 7 bit groups and keep as many as each needs
+    values = values.astype(np.uint32)
+    groups = (values[:, None] >> _VARINT_SHIFTS).astype(np.uint8) & 0x7F
+    lengths = 1 + (values[:, None] >= _VARINT_LIMITS).sum(axis=1, keepdims=True)
+    groups[_VARINT_GROUPS < lengths - 1] |= 0x80
+    return groups[_VARINT_GROUPS < lengths].tobytes()
+
+
+def make_palette(blocks: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Same result as np.unique(blocks, return_inverse=True), at less than half the cost
+    states = np.sort(blocks)
+    first = np.empty(len(states), dtype=bool)
+    first[0] = True
+    np.not_equal(states[1:], states[:-1], out=first[1:])
+    palette = states[first]
+    _palette_lookup[palette] = np.arange(len(palette), dtype=np.uint32)
+    return palette, _palette_lookup[blocks]
+
+
+def global_palette_bits(protocol: int) -> int:
+    return 14 if protocol >= PROTOCOL_1_13 else 13
+
+
+def encode_paletted_section(section: ChunkSection, protocol: int, sky_light: bool) -> bytes:
+    # 1.9 and later: bits per block, palette, packed indices, then the light arrays
+    palette, indices = make_palette(section.blocks)
+    bits = max(MIN_PALETTE_BITS, int(len(palette) - 1).bit_length())
+    if bits > MAX_PALETTE_BITS:
+        bits = global_palette_bits(protocol)
+        indices = section.blocks
+        # Before 1.13 an empty palette is still sent for the global one
+        header = [bytes((bits,))] if protocol >= PROTOCOL_1_13 else [bytes((bits,)), b"\x00"]
+    else:
+        header = [bytes((bits,)), pack_varint(len(palette)), pack_varints(palette)]
+
+    parts = header + [pack_varint(64 * bits), pack_longs(indices, bits), pack_nibbles(section.block_light)]
+    if sky_light:
+        parts.append(pack_nibbles(section.sky_light))
+    return b"".join(parts)
+
+
+def encode_column_1_9(sections: Sequence[Optional[ChunkSection]], protocol: int,
+                      biomes: Optional[np.ndarray], sky_light: bool) -> Tuple[int, bytes]:
+    mask = 0
+    parts = []
+    for y, section in enumerate(sections):
+        if section is not None:
+            mask |= 1 << y
+            parts.append(encode_paletted_section(section, protocol, sky_light))
+    if biomes is not None:
+        parts.append(biomes.astype(">i4" if protocol >= PROTOCOL_1_13 else np.uint8).tobytes())
+    return mask, b"".join(parts)
+
+
+def encode_column_1_8(sections: Sequence[Optional[ChunkSection]],
+                      biomes: Optional[np.ndarray], sky_light: bool) -> Tuple[int, bytes]:
+    # Block states as little-endian shorts for every section, then each kind of light in turn
+    present = [(y, section) for y, section in enumerate(sections) if section is not None]
+    parts = [section.blocks.astype("<u2").tobytes() for _, section in present]
+    parts += [pack_nibbles(section.block_light) for _, section in present]
+    if sky_light:
+        parts += [pack_nibbles(section.sky_light) for _, section in present]
+    if biomes is not None:
+        parts.append(biomes.astype(np.uint8).tobytes())
+    return sum(1 << y for y, _ in present), b"".join(parts)
+
+
+def encode_column_1_7(sections: Sequence[Optional[ChunkSection]], biomes: Optional[np.ndarray],
+                      sky_light: bool, level: int) -> Tuple[int, int, bytes]:
+    # Block ids, metadata, light and the ids' upper 4 bits in separate arrays, zlib compressed
+    present = [(y, section) for y, section in enumerate(sections) if section is not None]
+    parts: List[bytes] = [((section.blocks >> 4) & 0xFF).astype(np.uint8).tobytes() for _, section in present]
+    parts += [pack_nibbles(section.blocks & 15) for _, section in present]
+    parts += [pack_nibbles(section.block_light) for _, section in present]
+    if sky_light:
+        parts += [pack_nibbles(section.sky_light) for _, section in present]
+
+    add_mask = 0
+    for y, section in present:
+        add = section.blocks >> 12
+        if add.any():
+            add_mask |= 1 << y
+            parts.append(pack_nibbles(add))
+    if biomes is not None:
+        parts.append(biomes.astype(np.uint8).tobytes())
+    return sum(1 << y for y, _ in present), add_mask, zlib.compress(b"".join(parts), level)
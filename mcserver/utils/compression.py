@@ -0,0 +1,47 @@
+# Stdlib
+import zlib
+
+# External Libraries
+from anyio import run_in_thread
+
+# MCServer
+from mcserver.utils.misc import pack_varint, unpack_varint
+
+# Largest uncompressed packet a client may announce, same limit as the vanilla server
+MAX_PACKET_SIZE = 1 << 21
+
+
+def compress_packet(payload: bytes, threshold: int, level: int) -> bytes:
+    # Packet length, data length (0 when sent uncompressed), then the data itself
+    if len(payload) < threshold:
+        return pack_varint(len(payload) + 1) + b"\x00" + payload
+
+    data_length = pack_varint(len(payload))
+    data = zlib.compress(payload, level)
+    return pack_varint(len(data_length) + len(data)) + data_length + data
+
+
+async def compress_packet_async(payload: bytes, threshold: int, level: int, offload_size: int) -> bytes:
+    if threshold <= len(payload) and offload_size <= len(payload):
+        # zlib releases the GIL, so large payloads compress in parallel with the event loop
+        return await run_in_thread(compress_packet, payload, threshold, level)
+    return compress_packet(payload, threshold, level)
+
+
+def decompress_packet(frame: memoryview, threshold: int) -> memoryview:
+    data_length, offset = unpack_varint(frame)
+    if not offset:
+        raise ValueError("Compressed packet ends inside its data length")
+    if data_length == 0:
+        return frame[offset:]
+
+    if data_length < threshold:
+        raise ValueError(f"Compressed packet of {data_length} bytes is below the threshold of {threshold}")
+    if data_length > MAX_PACKET_SIZE:
+        raise ValueError(f"Compressed packet of {data_length} bytes is too large")
+
+    decompressor = zlib.decompressobj()
+    data = decompressor.decompress(frame[offset:], data_length)
+    if len(data) != data_length or decompressor.unconsumed_tail:
+        raise ValueError(f"Compressed packet announced {data_length} bytes but does not match")
+    return memoryview(data)
@@ -9,6 +9,9 @@ from cryptography.hazmat.backends import default_backend
 
 backend = default_backend()
 
+# update_into needs room for a block on top of the data, even for CFB8 which never uses it
+UPDATE_INTO_SLACK = 15
+
 PY3 = sys.version_info > (3,)
 
 
@@ -25,6 +28,29 @@ class Cipher(object):
     def disable(self):
         self.encryptor = None
         self.decryptor = None
+        self.out = bytearray()
+        self.out_view = memoryview(self.out)
+
+    def encrypt_into(self, data):
+        # Encrypts into a buffer owned by the cipher, the returned view is valid until the next call
+        if not self.encryptor:
+            return data
+
+        needed = len(data) + UPDATE_INTO_SLACK
+        if len(self.out) < needed:
+            # A new buffer rather than a resize, the previous view may still be referenced
+            self.out = bytearray(max(needed, len(self.out) * 2))
+            self.out_view = memoryview(self.out)
+        size = self.encryptor.update_into(data, self.out_view)
+        return self.out_view[:size]
+
+    def decrypt_into(self, data, buffer):
+        # `buffer` needs UPDATE_INTO_SLACK bytes more than `data`, returns the bytes written
+        if self.decryptor:
+            return self.decryptor.update_into(data, buffer)
+        size = len(data)
+        buffer[:size] = data
+        return size
 
     def encrypt(self, data):
         if self.encryptor:
@@ -98,3 +124,26 @@ def decrypt_secret(keypair, data):
     return keypair.decrypt(
         ciphertext=data,
         padding=padding.PKCS1v15())
+
+
+def export_private_key(keypair):
+    return keypair.private_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption())
+
+
+# Key of a worker process, loaded once by `init_worker` instead of pickled per call
+worker_keypair = None
+
+
+def init_worker(private_key):
+    global worker_keypair
+    worker_keypair = serialization.load_der_private_key(
+        data=private_key,
+        password=None,
+        backend=default_backend())
+
+
+def worker_decrypt_secrets(*data):
+    return tuple(decrypt_secret(worker_keypair, d) for d in data)
@@ -1,24 +1,104 @@
 # Stdlib
-from logging import DEBUG, getLogger, basicConfig
-from typing import Union
+import atexit
+from logging import DEBUG, INFO, Filter, Formatter, LogRecord, StreamHandler, getLogger
+from logging.handlers import QueueHandler, QueueListener
+import os
+from queue import SimpleQueue
+from time import monotonic
+from typing import Dict, List, Union
+
+# Debug lines with the same format string beyond this many per interval are dropped and counted
+DEBUG_BURST = 20
+DEBUG_INTERVAL = 1.0
 
-basicConfig(level=DEBUG)
 log = getLogger("MC-Server")
-log.setLevel(DEBUG)
+log.setLevel(INFO)
+log.propagate = False
+
+
+class DebugRateLimit(Filter):
+    # Keyed on the unformatted message, so per-packet lines share one budget. Expired windows
+    # are dropped once per interval, messages built with f-strings would pile up otherwise.
+    def __init__(self):
+        super().__init__()
+        self.windows: Dict[str, List] = {}
+        self.pruned = monotonic()
+
+    def filter(self, record: LogRecord) -> bool:
+        if record.levelno > DEBUG:
+            return True
+
+        now = monotonic()
+        window = self.windows.get(record.msg)
+        if now - self.pruned >= DEBUG_INTERVAL:
+            self.pruned = now
+            self.windows = {msg: kept for msg, kept in self.windows.items() if now - kept[0] < DEBUG_INTERVAL}
+
+        if window is None or now - window[0] >= DEBUG_INTERVAL:
+            suppressed = window[2] if window is not None else 0
+            self.windows[record.msg] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+            return True
+
+        if window[1] < DEBUG_BURST:
+            window[1] += 1
+            return True
+
+        window[2] += 1
+        return False
+
+
+class LocalQueueHandler(QueueHandler):
+    # The queue never leaves the process, so records can be passed on as they are. The default
+    # prepare() formats them on the calling thread to make them picklable.
+    def prepare(self, record: LogRecord) -> LogRecord:
+        return record
+
+
+# Records are formatted and written by a listener thread, the event loop only enqueues them
+handler = StreamHandler()
+handler.setFormatter(Formatter("%(levelname)s:%(name)s:%(message)s"))
+queue_handler = LocalQueueHandler(SimpleQueue())
+queue_handler.addFilter(DebugRateLimit())
+log.addHandler(queue_handler)
+listener: QueueListener = None
+
+
+def start_listener():
+    global listener
+    # Also runs in forked workers, where the parent's listener thread does not exist
+    queue_handler.queue = SimpleQueue()
+    listener = QueueListener(queue_handler.queue, handler)
+    listener.start()
+
+
+def stop_listener():
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+def set_level(level: Union[int, str]):
+    log.setLevel(level)
+
+
+start_listener()
+atexit.register(stop_listener)
+os.register_at_fork(after_in_child=start_listener)
 log.info("Logger ready")
 
 
-def info(data: Union[str, bytes]):
-    log.info(data)
+def info(msg: Union[str, bytes], *args, **kwargs):
+    log.info(msg, *args, **kwargs)
 
 
-def debug(data: Union[str, bytes]):
-    log.error(data)
+def debug(msg: Union[str, bytes], *args, **kwargs):
+    log.debug(msg, *args, **kwargs)
 
 
-def warn(data: Union[str, bytes]):
-    log.warning(data)
+def warn(msg: Union[str, bytes], *args, **kwargs):
+    log.warning(msg, *args, **kwargs)
 
 
-def error(data: Union[str, bytes]):
-    log.error(data)
+def error(msg: Union[str, bytes], *args, **kwargs):
+    log.error(msg, *args, **kwargs)
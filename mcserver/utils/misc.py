@@ -2,7 +2,8 @@
 from base64 import b64encode
 import inspect
 from os.path import join, isfile, dirname
-from typing import Optional, Tuple
+import struct
+from typing import Dict, Optional, Tuple
 
 DEFAULT_SERVER_PROPERTIES = {
     'generator-settings': '',
@@ -12,6 +13,7 @@ DEFAULT_SERVER_PROPERTIES = {
     'gamemode': 0,
     'broadcast-console-to-ops': True,
     'enable-query': False,
+    'query.port': 25565,
     'player-idle-timeout': 0,
     'difficulty': 1,
     'spawn-monsters': True,
@@ -45,11 +47,47 @@ DEFAULT_SERVER_PROPERTIES = {
 }
 
 
-def get_free_id():
-    x = 0
+STRUCTS: Dict[str, struct.Struct] = {}
+SMALL_VARINTS = [bytes((i,)) for i in range(0x80)]
+
+
+def get_struct(fmt: str) -> struct.Struct:
+    try:
+        return STRUCTS[fmt]
+    except KeyError:
+        layout = STRUCTS[fmt] = struct.Struct(">" + fmt)
+        return layout
+
+
+def pack_varint(number: int) -> bytes:
+    if 0 <= number < 0x80:
+        return SMALL_VARINTS[number]
+    if number < 0:
+        number += 1 << 32
+
+    out = bytearray()
     while True:
-        yield x
-        x += 1
+        b = number & 0x7F
+        number >>= 7
+        if number == 0:
+            out.append(b)
+            return bytes(out)
+        out.append(b | 0x80)
+
+
+def unpack_varint(data, pos: int = 0, end: Optional[int] = None, max_size: int = 5) -> Tuple[int, int]:
+    # The number and how many bytes it took, (-1, 0) if the data ends before the varint does
+    if end is None:
+        end = len(data)
+    number = 0
+    for i in range(max_size):
+        if pos + i >= end:
+            return -1, 0
+        b = data[pos + i]
+        number |= (b & 0x7F) << 7 * i
+        if not b & 0x80:
+            return number, i + 1
+    raise ValueError(f"Varint is longer than {max_size} bytes")
 
 
 def open_local(filename: str):
@@ -73,7 +111,7 @@ def read_config(file):
         line = line.strip()
         if line and not line.startswith("#"):
             k, v = line.split("=", 1)
-            if v.isdecimal():
+            if (v[1:] if v.startswith("-") else v).isdecimal():
                 v = int(v)
             if v in ("true", "false"):
                 v = v == "true"
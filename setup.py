@@ -14,7 +14,7 @@ if __name__ == '__main__':
         long_description="TODO",
         url="https://github.com/martmists/MCServer",
         packages=find_packages(),
-        install_requires=["anyio"],
+        install_requires=["anyio==1.4.0"],
         keywords=["Minecraft", "Python", "Server"],
         classifiers=[
             "Development Status :: 2 - Pre-Alpha",
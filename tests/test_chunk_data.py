@@ -0,0 +1,38 @@
+# External Libraries
+import numpy as np
+import pytest
+
+# MCServer
+from mcserver.game.chunk_section import SECTION_VOLUME
+from mcserver.utils.chunk_data import pack_longs, pack_varints
+from mcserver.utils.misc import pack_varint
+
+
+def reference_longs(values, bits: int) -> bytes:
+    # Every value in one big int, then cut into big-endian longs from the low end
+    packed = 0
+    for i, value in enumerate(values):
+        packed |= value << (i * bits)
+    return b"".join((packed >> (64 * i) & (1 << 64) - 1).to_bytes(8, "big") for i in range(len(values) * bits // 64))
+
+
+@pytest.mark.parametrize("bits", range(4, 17))
+def test_pack_longs(bits):
+    rng = np.random.default_rng(bits)
+    values = rng.integers(0, 1 << bits, SECTION_VOLUME)
+    assert pack_longs(values, bits) == reference_longs(values.tolist(), bits)
+
+
+def test_pack_longs_extremes():
+    for bits in (4, 13, 14):
+        for value in (0, (1 << bits) - 1):
+            values = np.full(SECTION_VOLUME, value)
+            assert pack_longs(values, bits) == reference_longs(values.tolist(), bits)
+
+
+def test_pack_varints():
+    # Every varint length, both sides of each boundary
+    edges = [0, 1, 127, 128, 16383, 16384, (1 << 21) - 1, 1 << 21, (1 << 28) - 1, 1 << 28, (1 << 32) - 1]
+    rng = np.random.default_rng(0)
+    values = np.concatenate([edges, rng.integers(0, 1 << 32, 1000, dtype=np.uint64)]).astype(np.uint32)
+    assert pack_varints(values) == b"".join(pack_varint(value) for value in values.tolist())
@@ -0,0 +1,76 @@
+# Stdlib
+import struct
+from types import SimpleNamespace
+
+# External Libraries
+import pytest
+
+# MCServer
+from mcserver.objects.player_registry import PlayerRegistry
+from mcserver.objects.query_server import QueryServer
+from mcserver.objects.server_core import ServerCore
+
+HOST = "127.0.0.1"
+SESSION = 0x01020304
+
+
+@pytest.fixture
+def query(monkeypatch):
+    for key, value in (("motd", "Test Server"), ("level-name", "world"), ("max-players", 20),
+                       ("server-port", 25565), ("server-ip", "")):
+        monkeypatch.setitem(ServerCore.options, key, value)
+    players = (SimpleNamespace(name="Notch"), SimpleNamespace(name="jeb_"))
+    monkeypatch.setattr(PlayerRegistry, "all_players", classmethod(lambda cls: players))
+    monkeypatch.setattr(PlayerRegistry, "player_count", classmethod(lambda cls: len(players)))
+    monkeypatch.setattr(QueryServer, "key", None)
+    return QueryServer
+
+
+def request(kind: int, payload: bytes = b"") -> bytes:
+    return b"\xfe\xfd" + bytes((kind,)) + struct.pack(">i", SESSION) + payload
+
+
+def handshake(query) -> int:
+    response = query.handle(request(9), HOST)
+    assert response[:5] == b"\x09" + struct.pack(">i", SESSION)
+    assert response.endswith(b"\x00")
+    return int(response[5:-1])
+
+
+def test_basic_stat(query):
+    token = handshake(query)
+    response = query.handle(request(0, struct.pack(">i", token)), HOST)
+    assert response[:5] == b"\x00" + struct.pack(">i", SESSION)
+
+    motd, gametype, level, online, max_players, rest = response[5:].split(b"\x00", 5)
+    assert (motd, gametype, level, online, max_players) == (b"Test Server", b"SMP", b"world", b"2", b"20")
+    # Port as a little-endian short, then the host
+    assert struct.unpack("<H", rest[:2])[0] == 25565
+    assert rest[2:] == b"0.0.0.0\x00"
+
+
+def test_full_stat(query):
+    token = handshake(query)
+    response = query.handle(request(0, struct.pack(">i", token) + b"\x00" * 4), HOST)
+    assert response[:5] == b"\x00" + struct.pack(">i", SESSION)
+
+    body = response[5:]
+    assert body.startswith(b"splitnum\x00\x80\x00")
+    fields, players = body[11:].split(b"\x00\x00\x01player_\x00\x00")
+    fields = fields.split(b"\x00")
+    stats = dict(zip(fields[::2], fields[1::2]))
+    assert stats[b"hostname"] == b"Test Server"
+    assert stats[b"game_id"] == b"MINECRAFT"
+    assert stats[b"numplayers"] == b"2"
+    assert stats[b"maxplayers"] == b"20"
+    assert stats[b"hostport"] == b"25565"
+    assert players == b"Notch\x00jeb_\x00\x00"
+
+
+def test_rejects_bad_requests(query):
+    token = handshake(query)
+    # Token issued to another address
+    assert query.handle(request(0, struct.pack(">i", token)), "10.0.0.1") is None
+    assert query.handle(request(0, struct.pack(">i", token ^ 1)), HOST) is None
+    assert query.handle(b"\xfe\xfe" + request(0)[2:] + struct.pack(">i", token), HOST) is None
+    assert query.handle(b"\xfe\xfd\x09", HOST) is None
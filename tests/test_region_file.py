@@ -0,0 +1,63 @@
+# Stdlib
+import os
+import random
+
+# MCServer
+from mcserver.classes.region_file import SECTOR_SIZE, RegionFile
+
+
+def make_chunk(rng: random.Random, size: int) -> bytes:
+    # Random bytes barely compress, so the payload really spans size // SECTOR_SIZE sectors
+    return rng.getrandbits(8 * size).to_bytes(size, "big")
+
+
+def test_round_trip(tmp_path):
+    rng = random.Random(1)
+    path = str(tmp_path / "r.0.0.mca")
+    chunks = {
+        (0, 0): b"small chunk",
+        (31, 31): make_chunk(rng, 100),
+        (5, 7): make_chunk(rng, 3 * SECTOR_SIZE),
+        # Chunk coordinates wrap around inside the region
+        (-1, 2): make_chunk(rng, SECTOR_SIZE),
+    }
+
+    region = RegionFile(path, create=True)
+    assert region.read_chunk(0, 0) is None
+    for (x, z), data in chunks.items():
+        region.write_chunk(x, z, data)
+    for (x, z), data in chunks.items():
+        assert region.read_chunk(x, z) == data
+    region.close()
+
+    region = RegionFile(path)
+    for (x, z), data in chunks.items():
+        assert region.has_chunk(x, z)
+        assert region.read_chunk(x, z) == data
+    assert not region.has_chunk(1, 1)
+    assert region.read_chunk(1, 1) is None
+    region.close()
+
+
+def test_rewrite_reuses_sectors(tmp_path):
+    rng = random.Random(2)
+    path = str(tmp_path / "r.0.0.mca")
+    region = RegionFile(path, create=True)
+    region.write_chunk(0, 0, make_chunk(rng, 2 * SECTOR_SIZE))
+    region.write_chunk(1, 0, b"neighbour")
+
+    # Outgrows its sectors, so it moves to the end of the file
+    grown = make_chunk(rng, 4 * SECTOR_SIZE)
+    region.write_chunk(0, 0, grown)
+    size = os.path.getsize(path)
+    # Fits the sectors freed by the move
+    shrunk = b"shrunk"
+    region.write_chunk(2, 0, shrunk)
+    assert os.path.getsize(path) == size
+    region.close()
+
+    region = RegionFile(path)
+    assert region.read_chunk(0, 0) == grown
+    assert region.read_chunk(1, 0) == b"neighbour"
+    assert region.read_chunk(2, 0) == shrunk
+    region.close()